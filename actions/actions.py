@@ -1,206 +1,226 @@
-from typing import Any, Text, Dict, List
+from typing import TYPE_CHECKING, Any, Text, Dict, List, Optional, Tuple
+from contextvars import ContextVar
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
-import groq
+import asyncio
 import json
 import logging
+import os
 import re
-from datetime import datetime, timedelta
-import nltk
-from nltk.tokenize import sent_tokenize
-
-# Download NLTK data for sentence tokenization
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+from actions.llm_client import get_llm_client
+from actions.singleflight import llm_singleflight
+from actions.answer_store import get_answer_store
+from actions.cache import classify_cache, answer_cache
+from actions.cpu_pool import run_cpu_bound
+from actions.normalizer import normalize_spelling
+from actions.prompts import (
+    ANSWER_PROMPT,
+    CLASSIFY_PROMPT,
+    PROMPT_TEMPLATES,
+    SUB_QUERY_ANSWER_PROMPT,
+    SUB_QUERY_BATCH_CLASSIFY_PROMPT,
+    SUB_QUERY_CLASSIFY_PROMPT,
+    truncate_tokens,
+)
+from actions.keywords import INTENTS, keyword_matcher
+from actions.knowledge_base import KnowledgeBase, get_knowledge_base
+from actions.resilience import LLMUnavailableError
+from actions.retrieval import RETRIEVAL_DIRECT_ANSWER, Retrieval, get_retriever
+from actions.sentences import split_sentences
+from actions.streaming import ANSWER_STREAMING, ANSWER_STREAM_PUSH_URL, push_sentence, stream_sentences
+from actions.metrics import (
+    FALLBACKS,
+    INTENT_SOURCES,
+    REGISTRY,
+    STAGE_LATENCY,
+    record_cache_lookup,
+    start_metrics_server,
+    timed_action,
+    timed_stage,
+)
+from actions.warmup import start_warm_up, warm_up_timings
+
+if TYPE_CHECKING:
+    from actions.semantic_cache import SemanticCache
+
+# Set up logging; DEBUG logs every prompt and response, so keep it for development
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
-# Cache for frequent queries with expiration
-query_cache = {}  # {key: {"result": result, "timestamp": datetime}}
-CACHE_EXPIRY = timedelta(hours=24)
-
-def is_cache_valid(cache_entry):
-    return datetime.now() - cache_entry["timestamp"] < CACHE_EXPIRY
-
-# Extended spelling and synonym variation dictionary for normalization
-SPELLING_VARIATIONS = {
-    "fertiliser": "fertilizer",
-    "fertilisers": "fertilizer",
-    "manoeuvre": "maneuver",
-    "manoeuvres": "maneuver",
-    "colour": "color",
-    "colours": "color",
-    "organisation": "organization",
-    "organisations": "organization",
-    "manure": "manure",
-    "manures": "manure",
-    "compost": "manure",
-    "organic fertilizer": "manure",
-    "green manure": "manure",
-    "vermicompost": "manure",
-    "soil": "soil",
-    "soils": "soil",
-    "land": "soil",
-    "ground": "soil",
-    "earth": "soil",
-    "variety": "variety",
-    "varieties": "variety",
-    "hybrid": "variety",
-    "breed": "variety",
-    "cultivar": "variety",
-    "strain": "variety",
-    "type": "variety",
-    "kind": "variety",
-    "intercrop": "intercrop",
-    "intercrops": "intercrop",
-    "research center": "research_station",
-    "research institute": "research_station",
-    "station": "research_station",
-    "facility": "research_station",
-    "nutrient": "fertilizer",
-    "chemical": "fertilizer",
-    "feed": "fertilizer",
-    "weather": "climate",
-    "environment": "climate",
-    "conditions": "climate",
-    "nut": "seed",
-    "seedling": "seed",
-    "propagule": "seed"
-}
-
-def normalize_spelling(text: str) -> str:
-    """Normalize spelling variations and synonyms to a standard form."""
-    words = text.split()
-    normalized_words = []
-    for word in words:
-        # Remove punctuation for matching
-        clean_word = re.sub(r'[^\w\s]', '', word.lower())
-        # Check if the word matches any variation or synonym
-        for variation, standard in SPELLING_VARIATIONS.items():
-            if re.fullmatch(rf"{re.escape(variation)}(s)?", clean_word, re.IGNORECASE):
-                normalized_words.append(standard)
-                break
-        else:
-            normalized_words.append(clean_word)
-    return " ".join(normalized_words)
+# Expose counters and latency histograms on /metrics
+REGISTRY.register_stats("cache", classify_cache.stats, cache="classify")
+REGISTRY.register_stats("cache", answer_cache.stats, cache="answer")
+REGISTRY.register_stats("llm_singleflight", llm_singleflight.stats)
+REGISTRY.register_stats("retrieval", lambda: get_retriever().stats())
+REGISTRY.register_stats("semantic_cache", lambda: get_semantic_cache().stats())
+REGISTRY.register_stats("llm_circuit_breaker", lambda: get_llm_client().breaker.stats())
+REGISTRY.register_stats(
+    "llm_rate_limiter", lambda: get_llm_client().rate_limiter.stats() if get_llm_client().rate_limiter else {}
+)
+for template in PROMPT_TEMPLATES:
+    REGISTRY.register_stats("prompt_template", template.stats, prompt=template.name)
+REGISTRY.register_stats("warm_up", lambda: {"seconds": dict(warm_up_timings)})
+start_metrics_server()
+
+# Load the knowledge base, indexes, local classifier and caches without blocking startup
+start_warm_up()
+
+# Details the LLM tends to invent; answers mentioning them are replaced by the knowledge-base fallback
+INVALID_ANSWER_TERMS = ["ph", "triangular", "1-2 cm", "sandy loam", "specific ph"]
+
+# Reuse the answer to a previous paraphrase of the query (tuning: actions/semantic_cache.py)
+SEMANTIC_CACHE = os.environ.get("SEMANTIC_CACHE", "true").lower() == "true"
+
+# Multi-intent handling: overall time budget per message, and whether to classify sub-queries in one LLM call
+MULTI_INTENT_DEADLINE = float(os.environ.get("MULTI_INTENT_DEADLINE", "15"))
+MULTI_INTENT_BATCH_CLASSIFY = os.environ.get("MULTI_INTENT_BATCH_CLASSIFY", "true").lower() == "true"
+SUB_QUERY_TIMEOUT_MESSAGE = "Sorry, this part is taking too long to answer. Please ask it separately!"
+
+# Where the last answer of ActionAnswerQuery in this task came from: "llm", "cache", "precomputed",
+# "semantic", "direct" (knowledge base without an LLM call) or "fallback" (used by actions/precompute.py)
+answer_source: ContextVar[Optional[Text]] = ContextVar("answer_source", default=None)
+
+
+def is_valid_classification(result: Any) -> bool:
+    """Whether an LLM classification is an object naming a known intent or "ambiguous"."""
+    return isinstance(result, dict) and (result.get("intent") in INTENTS or result.get("intent") == "ambiguous")
+
+
+def classify_locally(text: Text) -> Optional[Dict[Text, Text]]:
+    # Imported on first use to keep numpy off the import path
+    from actions.intent_classifier import classify_locally as classify
+
+    return classify(text)
+
+
+def precomputed_classification(normalized_message: Text) -> Optional[Dict[Text, Text]]:
+    """{"intent": ...} for a question classified offline by `python -m actions.precompute`."""
+    store = get_answer_store()
+    intent = store.intent(normalized_message) if store is not None else None
+    return {"intent": intent} if intent is not None else None
+
+
+def precomputed_answer(intent: Text, normalized_message: Text, knowledge_base: KnowledgeBase) -> Optional[Text]:
+    """Answer generated offline by `python -m actions.precompute` from the current knowledge base."""
+    store = get_answer_store()
+    return store.answer(intent, normalized_message, knowledge_base.fingerprint) if store is not None else None
+
+
+def get_semantic_cache() -> "SemanticCache":
+    # Imported on first use to keep numpy off the import path
+    from actions.semantic_cache import semantic_cache
+
+    return semantic_cache
+
+
+async def gather_until(coroutines: List[Any], deadline: float) -> List[Optional[Any]]:
+    """Run coroutines concurrently and return their results in order; None for any still running at `deadline`."""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    if not tasks:
+        return []
+    timeout = max(0.0, deadline - asyncio.get_running_loop().time())
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        logger.warning("%s of %s tasks missed the deadline", len(pending), len(tasks))
+    for task in done:
+        if task.exception() is not None:
+            logger.error("Concurrent task failed: %s", task.exception())
+    return [task.result() if task in done and task.exception() is None else None for task in tasks]
 
 class ActionClassifyIntent(Action):
     def name(self) -> Text:
         return "action_classify_intent"
 
+    @timed_action
     async def run(
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
     ) -> List[Dict[Text, Any]]:
         user_message = tracker.latest_message.get("text").lower()
         # Normalize spelling variations and synonyms
-        normalized_message = normalize_spelling(user_message)
-        logger.debug(f"Original message: {user_message}, Normalized message: {normalized_message}")
-
-        intents = [
-            "coconut_general", "climate_soils", "coconut_varieties", "cultivation_methods",
-            "nutrient_management", "fertilizers", "inter_cultivation", "organic_manures"
-        ]
-
-        # Keyword-based fallback for robust classification (using normalized forms)
-        keyword_map = {
-            "nutrient_management": ["yellow", "yellowing", "spathe", "deficiency", "nitrogen", "phosphorus", "potash", "potassium", "barren", "drop", "symptoms", "mineral"],
-            "cultivation_methods": ["nursery", "soil", "arrange", "planting", "seed", "seedling", "pit", "germination", "nut", "propagule"],
-            "fertilizers": ["fertilizer", "urea", "potash", "manure", "neem cake", "super phosphate", "nutrient", "chemical", "feed"],
-            "coconut_varieties": ["variety", "godavari ganga", "east coast tall", "double century", "gauthami ganga", "vasishta ganga", "vainateya ganga", "abhaya ganga", "hybrid", "breed", "cultivar", "strain", "type", "kind"],
-            "climate_soils": ["climate", "soil", "rainfall", "humidity", "temperature", "irrigation", "drainage", "weather", "environment", "conditions", "land", "ground", "earth"],
-            "coconut_general": ["cultivation", "area", "productivity", "district", "research", "ambajipeta", "yield increase", "research_station", "research center", "research institute", "facility"],
-            "inter_cultivation": ["intercrop", "plow", "weed", "banana", "cocoa", "companion crop"],
-            "organic_manures": ["manure", "compost", "vermicompost", "coconut waste", "green manure", "organic fertilizer"]
-        }
+        with timed_stage(self.name(), "normalize"):
+            normalized_message = normalize_spelling(user_message)
+        logger.debug("Original message: %s, Normalized message: %s", user_message, normalized_message)
 
         # Check cache
         classified_intent = tracker.get_slot("classified_intent")
         cache_key = f"classify_{normalized_message}_{classified_intent if classified_intent else 'none'}"
-        if cache_key in query_cache and is_cache_valid(query_cache[cache_key]):
-            logger.debug(f"Cache hit for query: {user_message}")
-            result = query_cache[cache_key]["result"]
+        with timed_stage(self.name(), "cache_lookup"):
+            result = record_cache_lookup("classify", classify_cache.get(cache_key))
+        precomputed = None
+        if result is None:
+            with timed_stage(self.name(), "precomputed_lookup"):
+                precomputed = record_cache_lookup("precomputed_intent", precomputed_classification(normalized_message))
+        if result is not None:
+            INTENT_SOURCES.inc(source="cache")
+            logger.debug("Cache hit for query: %s", user_message)
+        elif precomputed is not None:
+            result = precomputed
+            INTENT_SOURCES.inc(source="precomputed")
+            logger.debug("Precomputed intent for query: %s: %s", user_message, result["intent"])
         else:
             # Keyword-based pre-check
-            matched_intents = []
-            for intent, keywords in keyword_map.items():
-                for keyword in keywords:
-                    # Match keyword with optional 's' for plural forms
-                    pattern = rf"\b{re.escape(keyword)}(s)?\b"
-                    if re.search(pattern, normalized_message, re.IGNORECASE):
-                        matched_intents.append(intent)
-                        break
-            logger.debug(f"Keyword matches for {user_message}: {matched_intents}")
+            with timed_stage(self.name(), "keyword_match"):
+                matched_intents = keyword_matcher.matched_intents(normalized_message)
+            logger.debug("Keyword matches for %s: %s", user_message, matched_intents)
 
+            result = None
             if len(matched_intents) == 1:
                 result = {"intent": matched_intents[0]}
-                logger.debug(f"Keyword-based intent match: {matched_intents[0]}")
+                INTENT_SOURCES.inc(source="keyword")
+                logger.debug("Keyword-based intent match: %s", matched_intents[0])
             else:
-                # Initialize Groq client
-                client = groq.Groq(api_key="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")
-
+                # Zero or several keyword matches: try the local classifier before the LLM
+                with timed_stage(self.name(), "local_classifier"):
+                    result = await run_cpu_bound(classify_locally, normalized_message)
+                if result is not None:
+                    INTENT_SOURCES.inc(source="local_classifier")
+                    logger.debug("Local classifier intent match: %s", result['intent'])
+
+            if result is None and not get_llm_client().available:
+                # The LLM is failing: ask about the keyword matches instead of waiting for it to time out
+                logger.warning("LLM unavailable, skipping LLM intent classification")
+                FALLBACKS.inc(action=self.name(), reason="llm_unavailable")
+                topics = " or ".join(intent.replace("_", " ") for intent in matched_intents)
+                result = {
+                    "intent": "ambiguous",
+                    "clarifying_question": f"Could you clarify if you're asking about {topics}?" if topics else None,
+                }
+
+            if result is None:
                 # Prepare conversation history
                 conversation_history = [
                     event.get("text") for event in tracker.events[-4:] if event.get("event") == "user"
                 ]
-                logger.debug(f"Conversation history for intent classification: {conversation_history}")
-
-                # Prepare prompt for intent classification
-                prompt = f"""
-                You are an assistant for coconut cultivation queries. Classify the user's query into one of the following intents:
-                {', '.join(intents)}.
-                Use the following rules:
-                - Queries about yellowing leaves, delayed spathes, or nutrient deficiencies (e.g., nitrogen, phosphorus, potash, minerals) → 'nutrient_management'.
-                - Queries about nursery setup, soil type, seed/nut selection, planting, or germination → 'cultivation_methods'.
-                - Queries about fertilizers, urea, potash, neem cake, nutrients, or chemicals → 'fertilizers'.
-                - Queries about coconut varieties (e.g., Godavari Ganga, East Coast Tall), hybrids, breeds, cultivars, strains, types, or kinds → 'coconut_varieties'.
-                - Queries about climate, weather, rainfall, humidity, soil types, or land conditions → 'climate_soils'.
-                - Queries about area, productivity, districts, or research (e.g., Ambajipeta research station, research center, or facility) → 'coconut_general'.
-                - Queries about intercrops, companion crops, plowing, or weed control → 'inter_cultivation'.
-                - Queries about organic manures, compost, vermicompost, or green manure → 'organic_manures'.
-                If the query is ambiguous or cannot be confidently classified, return 'ambiguous' and suggest a clarifying question based on likely intents.
-                Consider the conversation history to classify follow-up queries accurately.
-                Treat spelling variations (e.g., 'fertiliser'/'fertilizer') and synonyms (e.g., 'hybrid'/'variety', 'compost'/'manure', 'weather'/'climate', 'nut'/'seed') as equivalent for intent classification.
-                Provide the response in JSON format with 'intent' and 'clarifying_question' (if applicable).
-
-                Conversation history: {conversation_history}
-                User query: {user_message}
-
-                Examples:
-                - "Suggest fertilizer schedule for coconut plants" → {{"intent": "fertilizers"}}
-                - "Suggest nutrient management for 2 years old coconut plants?" → {{"intent": "fertilizers"}}
-                - "Why are my coconut leaves yellow?" → {{"intent": "nutrient_management"}}
-                - "What soil for coconut nursery?" → {{"intent": "cultivation_methods"}}
-                - "How to grow coconuts?" → {{"intent": "ambiguous", "clarifying_question": "Could you specify if you're interested in cultivation methods, varieties, or fertilizers?"}}
-                - History: ["Nutrient deficiency symptoms in coconuts"], Query: "nitrogen deficiency symptoms in coconut?" → {{"intent": "nutrient_management"}}
-                - Query: "coconut varieties" → {{"intent": "coconut_varieties"}}
-                - Query: "Which coconut hybrid is released by Ambajipeta?" → {{"intent": "coconut_varieties"}}
-                - Query: "Coconut breed from research center Ambajipeta?" → {{"intent": "coconut_varieties"}}
-                - Query: "Compost for coconut trees?" → {{"intent": "organic_manures"}}
-                - Query: "Weather for coconut farming?" → {{"intent": "climate_soils"}}
-                - Query: "How to select coconut nuts?" → {{"intent": "cultivation_methods"}}
-                """
+                logger.debug("Conversation history for intent classification: %s", conversation_history)
+
+                # Static instructions and examples first, then the history and query within the token budget
+                prompt = CLASSIFY_PROMPT.render(conversation_history, query=user_message)
                 
+                raw_response = None
                 try:
-                    logger.debug(f"Sending query to Groq: {user_message}")
-                    response = client.chat.completions.create(
-                        model="llama3-70b-8192",
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=0.3,
-                        max_tokens=100
-                    )
-                    raw_response = response.choices[0].message.content
-                    logger.debug(f"Groq raw response: {raw_response}")
+                    logger.debug("Sending query to Groq: %s", user_message)
+                    # Identical in-flight classifications share one LLM call
+                    with timed_stage(self.name(), "llm_call"):
+                        raw_response = await llm_singleflight.do(
+                            cache_key, lambda: get_llm_client().complete(prompt.text, max_tokens=100)
+                        )
+                    logger.debug("Groq raw response: %s", raw_response)
                     result = json.loads(raw_response)
-                    query_cache[cache_key] = {"result": result, "timestamp": datetime.now()}
+                    INTENT_SOURCES.inc(source="llm")
+                    classify_cache.set(cache_key, result)
                 except json.JSONDecodeError as e:
-                    logger.error(f"JSON parsing error: {e}, raw response: {raw_response}")
+                    logger.error("JSON parsing error: %s, raw response: %s", e, raw_response)
+                    FALLBACKS.inc(action=self.name(), reason="invalid_json")
                     result = {"intent": "ambiguous", "clarifying_question": "Could you clarify your question about coconut cultivation?"}
+                except LLMUnavailableError as e:
+                    logger.warning("Skipped LLM intent classification: %s", e)
+                    FALLBACKS.inc(action=self.name(), reason="llm_unavailable")
+                    result = {"intent": "ambiguous"}
                 except Exception as e:
-                    logger.error(f"Error in action_classify_intent: {e}")
+                    logger.error("Error in action_classify_intent: %s", e)
+                    FALLBACKS.inc(action=self.name(), reason="llm_error")
                     result = {"intent": "ambiguous", "clarifying_question": "Sorry, I couldn't process your query. Please specify if it's about fertilizers, varieties, or another topic."}
 
         intent = result.get("intent")
@@ -211,165 +231,239 @@ class ActionClassifyIntent(Action):
             dispatcher.utter_message(text=clarifying_question)
             return []
         else:
-            logger.debug(f"Classified intent: {intent}")
+            logger.debug("Classified intent: %s", intent)
             return [{"event": "slot", "name": "classified_intent", "value": intent}]
 
 class ActionAnswerQuery(Action):
     def name(self) -> Text:
         return "action_answer_query"
 
+    @timed_action
     async def run(
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
     ) -> List[Dict[Text, Any]]:
         classified_intent = tracker.get_slot("classified_intent")
         user_message = tracker.latest_message.get("text").lower()
-        normalized_message = normalize_spelling(user_message)  # Normalize for cache key
+        with timed_stage(self.name(), "normalize"):
+            normalized_message = normalize_spelling(user_message)  # Normalize for cache key
 
         if not classified_intent:
             logger.error("No classified intent found in slot")
             dispatcher.utter_message(text="I couldn't understand your query. Please specify if it's about coconut varieties, fertilizers, or another topic.")
             return []
 
-        # Structured data from provided input
-        data = {
-            "coconut_general": {
-                "overview": "Our state cultivates coconuts on 1.17 lakh hectares, ranking 4th in area after Kerala, Tamil Nadu, and Karnataka, and 1st in productivity. Over half the area is in the twin Godavari districts, with Guntur and Chittoor also significant. Scientific methods can boost yields in North Coast and Krishna areas.",
-                "research": "Research at Ambajipeta Horticultural Research Station spans 70 years under Dr. Y.S.R. Horticultural University."
-            },
-            "climate_soils": {
-                "climate": "Coastal areas with 1000-2000 mm rainfall and high humidity are ideal. Growth reduces below 15°C.",
-                "soils": "Fertile delta lands or gravelly/red soils with irrigation and drainage are suitable. Inland areas are not ideal."
-            },
-            "coconut_varieties": {
-                "East Coast Tall": "Widely grown in East Coast regions. Yields 75-100 nuts/year, 146g copra, 64% oil, fruits in 7 years.",
-                "Godavari Ganga": "Hybrid developed in 1991 at Ambajipeta by crossing East Coast Tall and Ganga Bondam, released for Andhra Pradesh and Tamil Nadu. Yields 140 nuts/year, 150g copra, 68% oil, fruits in2 years.",
-                "Double Century": "Released in 1994, suitable for East Coast. Yields 130 nuts/year, 160g copra, 64% oil, fruits in 7 years.",
-                "Gauthami Ganga": "Selected from Ganga Bondam dwarf variety, released in 2017, ideal for tender coconuts. Yields 85-94 nuts/year, 157g copra, 69% oil, fruits in 4 years.",
-                "Vasishta Ganga": "Hybrid developed in 2014 by crossing Ganga Bondam dwarf and Philippines Ordinary Tall, released for Andhra Pradesh and Karnataka. Yields 125 nuts/year, 158g copra, 69% oil, fruits in 4 years.",
-                "Vainateya Ganga": "Hybrid developed in 2017 by crossing Philippines Ordinary Tall and Ganga Bondam dwarf, released for Andhra Pradesh. Yields 118 nuts/year, 190.5g copra, 66% oil, fruits in 4 years.",
-                "Abhaya Ganga": "Hybrid developed in 2017 by crossing Ganga Bondam dwarf and Laccadive Ordinary Tall. Yields 136 nuts/year, 170g copra, 72% oil, fruits in 4 years."
-            },
-            "cultivation_methods": {
-                "seed_selection": "Select nuts from 15-40-year-old trees yielding 100 nuts/year with 150g copra. Collect in April-May, dry for 20 days, plant in June.",
-                "nursery": "Use light upland soils with drainage, plant nuts 30 cm between rows and 10-15 cm between nuts in a row. Irrigate frequently, control weeds/pests. Germination rate is 65-70%.",
-                "planting": "Select 1-1.5-year-old seedlings, dig 1x1x1m pits in April-May, fill with 25kg manure + 500g super phosphate, plant 60 seedlings/acre in June-July."
-            },
-            "nutrient_management": {
-                "phosphorus": "Strengthens seedling bases and leaf formation, aids nitrogen absorption. Apply 250g phosphorus with manure during planting.",
-                "potash": "Speeds fruition, increases spathes, improves copra/oil yield, enhances pest/stress resistance.",
-                "deficiencies": "Nitrogen: Yellow leaves, stunted growth, common in young plants. Phosphorus: Delayed spathes, poor nut maturity. Potash: Orange-yellow leaf spots, stunted trees, barren nuts, small nuts. General: Deficiencies in nitrogen or potash can cause improper flower setting or nut drop."
-            },
-            "fertilizers": {
-                "young_trees": "For 1-4 years: 0.5kg urea + 1kg super phosphate + 1kg potash + 20kg manure/year/tree.",
-                "mature_trees": "For >5 years: 1kg urea + 2kg super phosphate + 2.5kg potash + 25kg manure or 2kg neem cake/year/tree.",
-                "application": "Apply in two splits (June-July, September-October) in a trench 3 feet from trunk, cover with soil, irrigate. Avoid unscientific methods like adding salt or cutting roots."
-            },
-            "inter_cultivation": {
-                "plowing": "Plow rows twice yearly (early monsoon, post-rainy season) to control weeds.",
-                "intercrops": "Grow banana, cocoa, or groundnut for additional income."
-            },
-            "organic_manures": {
-                "role": "Stabilize yields by releasing nutrients slowly. Use with 50% chemical fertilizers.",
-                "preparation": "Convert 16 tonnes/hectare of coconut waste (leaves, husks) into compost.",
-                "benefits": "Retains moisture in light soils, increases organic carbon, boosts soil microorganisms, reduces salts/alkalinity, improves soil physical properties."
-            }
-        }
-
-        if classified_intent not in data:
-            logger.error(f"No data available for intent: {classified_intent}")
+        knowledge_base = get_knowledge_base()
+
+        if classified_intent not in knowledge_base:
+            logger.error("No data available for intent: %s", classified_intent)
             dispatcher.utter_message(text="Sorry, I don't have information for that topic. Try asking about coconut varieties or fertilizers!")
             return []
 
         # Check cache
         cache_key = f"answer_{classified_intent}_{normalized_message}"
-        if cache_key in query_cache and is_cache_valid(query_cache[cache_key]):
-            logger.debug(f"Cache hit for query: {user_message}")
-            answer = query_cache[cache_key]["result"]
+        source = "cache"
+        with timed_stage(self.name(), "cache_lookup"):
+            answer = record_cache_lookup("answer", answer_cache.get(cache_key))
+        if answer is None:
+            source = "precomputed"
+            with timed_stage(self.name(), "precomputed_lookup"):
+                answer = record_cache_lookup(
+                    "precomputed_answer", precomputed_answer(classified_intent, normalized_message, knowledge_base)
+                )
+            if answer is not None:
+                logger.debug("Precomputed answer for query: %s", user_message)
+        if answer is None and SEMANTIC_CACHE:
+            source = "semantic"
+            with timed_stage(self.name(), "semantic_cache_lookup"):
+                hit = record_cache_lookup("semantic", get_semantic_cache().lookup(classified_intent, user_message))
+            if hit is not None:
+                answer, cached_query, similarity = hit
+                logger.debug("Semantic cache hit for query: %s, cached query: %s (%.2f)", user_message, cached_query, similarity)
+                answer_cache.set(cache_key, answer)
+        # Select only the facts and examples relevant to this query
+        retrieval = None
+        if answer is None:
+            with timed_stage(self.name(), "retrieval"):
+                retrieval = get_retriever().retrieve(classified_intent, user_message)
+        if answer is not None:
+            logger.debug("Cache hit for query: %s", user_message)
+        elif RETRIEVAL_DIRECT_ANSWER and retrieval.direct_answer:
+            answer = retrieval.direct_answer
+            source = "direct"
+            logger.debug("Answered from knowledge base without LLM call: %s", answer)
+            answer_cache.set(cache_key, answer)
+        elif not get_llm_client().available:
+            # The LLM is failing: answer from the knowledge base right away (not cached, so the
+            # LLM answers this query again once it recovers)
+            logger.warning("LLM unavailable, answering from the knowledge base")
+            FALLBACKS.inc(action=self.name(), reason="llm_unavailable")
+            answer = retrieval.fallback_answer
+            source = "fallback"
         else:
-            # Initialize Groq client
-            client = groq.Groq(api_key="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")
-
             # Prepare conversation history
             conversation_history = [
                 event.get("text") for event in tracker.events[-6:] if event.get("event") == "user"
             ]
-            logger.debug(f"Conversation history: {conversation_history}")
+            logger.debug("Conversation history: %s", conversation_history)
 
             # Prepare prompt with strict data adherence
-            prompt = f"""
-            You are an expert in coconut cultivation. Answer the user's query using ONLY the provided data, ensuring accuracy and relevance. Use natural, conversational language, keeping the answer concise and targeted to the specific question (1-2 sentences if possible, up to 5 if needed). If the query is a follow-up, use the conversation history for context to provide a precise answer. If the query is too specific or unmapped, provide the most relevant subset of the data or suggest a related topic from the data. Treat synonyms like 'hybrid'/'variety', 'compost'/'manure', 'weather'/'climate', 'nut'/'seed', 'nutrient'/'fertilizer', 'land'/'soil', and 'research center'/'research_station' as equivalent.
-
-            Conversation history: {conversation_history}
-            Data for intent '{classified_intent}': {data.get(classified_intent, 'No data available.')}
-            User query: {user_message}
-
-            Examples:
-            - Query: "Why are my coconut leaves yellow?" (nutrient_management)
-              Answer: "Yellowing coconut leaves are likely due to nitrogen deficiency, causing stunted growth in young plants."
-            - Query: "nitrogen deficiency symptoms in coconut?" (nutrient_management)
-              Answer: "Nitrogen deficiency in coconut trees causes yellow leaves and stunted growth, especially in young plants."
-            - Query: "What soil for coconut nursery?" (cultivation_methods)
-              Answer: "For a coconut nursery, use light upland soils with drainage facilities and plant nuts 30 cm between rows."
-            - Query: "Name of coconut varieties" (coconut_varieties)
-              Answer: "Popular coconut varieties include East Coast Tall, Godavari Ganga, Double Century, Gauthami Ganga, Vasishta Ganga, Vainateya Ganga, and Abhaya Ganga."
-            - Query: "Suggest fertiliser management schedule for 2 years old coconut plants?" (fertilizers)
-              Answer: "For 2-year-old coconut plants, apply 0.5kg urea, 1kg super phosphate, 1kg potash, and 20kg manure per tree annually, in two splits (June-July, September-October) in a trench 3 feet from the trunk, then cover with soil and irrigate."
-            - Query: "Which coconut hybrid is released by Ambajipeta?" (coconut_varieties)
-              Answer: "The coconut hybrid Godavari Ganga was released by Ambajipeta in 1991."
-            - Query: "Coconut breed from research center Ambajipeta?" (coconut_varieties)
-              Answer: "The coconut variety Godavari Ganga, a hybrid, was released by Ambajipeta in 1991."
-            - Query: "Compost for coconut trees?" (organic_manures)
-              Answer: "Use 16 tonnes/hectare of coconut waste, like leaves and husks, to prepare compost for coconut trees, which stabilizes yields and improves soil health."
-            - Query: "Weather for coconut farming?" (climate_soils)
-              Answer: "Coconut farming thrives in coastal areas with 1000-2000 mm rainfall and high humidity, but growth reduces below 15°C."
-            - Query: "How to select coconut nuts?" (cultivation_methods)
-              Answer: "Select coconut nuts from 15-40-year-old trees yielding 100 nuts/year with 150g copra, collected in April-May and dried for 20 days."
-            """
+            prompt = ANSWER_PROMPT.render(
+                conversation_history,
+                examples=retrieval.examples_text,
+                intent=classified_intent,
+                data=retrieval.facts_text,
+                query=user_message,
+            )
+
+            if ANSWER_STREAMING:
+                answer, events, cacheable = await self.stream_answer(
+                    prompt.text, dispatcher, tracker.sender_id, classified_intent, knowledge_base, retrieval
+                )
+                if cacheable:
+                    answer_cache.set(cache_key, answer)
+                if cacheable and SEMANTIC_CACHE and answer != knowledge_base.fallback_text[classified_intent]:
+                    get_semantic_cache().put(classified_intent, user_message, answer)
+                return events
             
             try:
-                logger.debug(f"Generating answer for intent: {classified_intent}, query: {user_message}")
-                response = client.chat.completions.create(
-                    model="llama3-70b-8192",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.3,
-                    max_tokens=500
-                )
-                answer = response.choices[0].message.content.strip()
+                logger.debug("Generating answer for intent: %s, query: %s", classified_intent, user_message)
+                with timed_stage(self.name(), "llm_call"):
+                    answer = (await llm_singleflight.do(
+                        cache_key, lambda: get_llm_client().complete(prompt.text, max_tokens=500)
+                    )).strip()
                 
                 # Validate answer against data
-                invalid_terms = ["ph", "triangular", "1-2 cm", "sandy loam", "specific ph"]
-                if any(term in answer.lower() for term in invalid_terms):
-                    logger.warning(f"Answer contains invalid details: {answer}")
+                with timed_stage(self.name(), "validation"):
+                    invalid = any(term in answer.lower() for term in INVALID_ANSWER_TERMS)
+                if invalid:
+                    logger.warning("Answer contains invalid details: %s", answer)
+                    FALLBACKS.inc(action=self.name(), reason="invalid_answer")
                     # Fallback to full relevant data section
-                    answer = " ".join([v for v in data[classified_intent].values()])
+                    answer = knowledge_base.fallback_text[classified_intent]
+                    source = "fallback"
+                else:
+                    source = "llm"
+                    if SEMANTIC_CACHE:
+                        get_semantic_cache().put(classified_intent, user_message, answer)
                 
-                query_cache[cache_key] = {"result": answer, "timestamp": datetime.now()}
-                logger.debug(f"Generated answer: {answer}")
+                answer_cache.set(cache_key, answer)
+                logger.debug("Generated answer: %s", answer)
+            except LLMUnavailableError as e:
+                logger.warning("Skipped LLM answer: %s", e)
+                FALLBACKS.inc(action=self.name(), reason="llm_unavailable")
+                answer = retrieval.fallback_answer
+                source = "fallback"
             except Exception as e:
-                logger.error(f"Error in action_answer_query: {e}")
+                logger.error("Error in action_answer_query: %s", e)
+                FALLBACKS.inc(action=self.name(), reason="llm_error")
                 # Fallback to full relevant data section
-                answer = " ".join([v for v in data[classified_intent].values()])
-                query_cache[cache_key] = {"result": answer, "timestamp": datetime.now()}
+                answer = knowledge_base.fallback_text[classified_intent]
+                source = "fallback"
+                answer_cache.set(cache_key, answer)
 
+        answer_source.set(source)
         dispatcher.utter_message(text=answer)
         return []
 
+    async def stream_answer(
+        self,
+        prompt: Text,
+        dispatcher: CollectingDispatcher,
+        sender_id: Text,
+        classified_intent: Text,
+        knowledge_base: KnowledgeBase,
+        retrieval: Retrieval,
+    ) -> Tuple[Text, List[Dict[Text, Any]], bool]:
+        """Send the answer sentence by sentence while the LLM is still generating it.
+
+        Each sentence is validated as it completes; an invalid one stops the stream and the
+        knowledge-base fallback is sent instead; while the LLM is unavailable the retrieval's
+        fallback answer is sent, as in the non-streaming path. Returns the answer, the events to
+        return from the action, and whether the answer may be cached (not while it is unavailable).
+        """
+        delivered = []
+        pushed = []
+        push_url = ANSWER_STREAM_PUSH_URL
+
+        async def deliver(text: Text) -> None:
+            nonlocal push_url
+            if push_url:
+                try:
+                    await push_sentence(sender_id, text, push_url)
+                    pushed.append(text)
+                except Exception as e:
+                    # Not an LLM failure: send this and the remaining sentences with the action's response
+                    logger.error("Pushing a streamed sentence failed, replying through the dispatcher: %s", e)
+                    FALLBACKS.inc(action=self.name(), reason="push_error")
+                    push_url = None
+            if not push_url:
+                dispatcher.utter_message(text=text)
+            delivered.append(text)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deltas = get_llm_client().stream(prompt, max_tokens=500)
+        answer = None
+        cacheable = True
+        try:
+            async for sentence in stream_sentences(deltas, split_sentences):
+                if any(term in sentence.lower() for term in INVALID_ANSWER_TERMS):
+                    logger.warning("Streamed sentence contains invalid details: %s", sentence)
+                    FALLBACKS.inc(action=self.name(), reason="invalid_answer")
+                    answer = knowledge_base.fallback_text[classified_intent]
+                    break
+                if not delivered:
+                    STAGE_LATENCY.observe(loop.time() - start, action=self.name(), stage="first_sentence")
+                await deliver(sentence)
+        except LLMUnavailableError as e:
+            logger.warning("Skipped streaming answer: %s", e)
+            FALLBACKS.inc(action=self.name(), reason="llm_unavailable")
+            answer = retrieval.fallback_answer
+            # Like the non-streaming path: answer from the LLM again once it recovers
+            cacheable = False
+        except Exception as e:
+            logger.error("Error streaming answer: %s", e)
+            FALLBACKS.inc(action=self.name(), reason="llm_error")
+            answer = knowledge_base.fallback_text[classified_intent]
+        finally:
+            await deltas.aclose()
+        STAGE_LATENCY.observe(loop.time() - start, action=self.name(), stage="llm_call")
+
+        if answer is None and not delivered:
+            logger.warning("LLM streamed an empty answer")
+            FALLBACKS.inc(action=self.name(), reason="empty_answer")
+            answer = knowledge_base.fallback_text[classified_intent]
+        if answer is None:
+            answer = " ".join(delivered)
+            answer_source.set("llm")
+            logger.debug("Streamed answer: %s", answer)
+        else:
+            answer_source.set("fallback")
+            # Fall back to the full relevant data section for the rest of the reply
+            await deliver(answer)
+
+        # Pushed sentences bypass the dispatcher, so record them on the tracker as a bot event
+        events = [{"event": "bot", "text": " ".join(pushed)}] if pushed else []
+        return answer, events, cacheable
+
 class ActionHandleMultiIntent(Action):
     def name(self) -> Text:
         return "action_handle_multi_intent"
 
+    @timed_action
     async def run(
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
     ) -> List[Dict[Text, Any]]:
         user_message = tracker.latest_message.get("text").lower()
-        logger.debug(f"Processing multi-intent query: {user_message}")
+        logger.debug("Processing multi-intent query: %s", user_message)
 
         # Split the message into sub-queries using sentence tokenization and conjunctions
-        sub_queries = sent_tokenize(user_message)
-        if len(sub_queries) == 1:
-            # Try splitting by conjunctions (e.g., "and", "also")
-            sub_queries = re.split(r'\band\b|\balso\b|,', user_message)
-            sub_queries = [q.strip() for q in sub_queries if q.strip()]
+        with timed_stage(self.name(), "split"):
+            sub_queries = split_sentences(user_message)
+            if len(sub_queries) == 1:
+                # Try splitting by conjunctions (e.g., "and", "also")
+                sub_queries = re.split(r'\band\b|\balso\b|,', user_message)
+                sub_queries = [q.strip() for q in sub_queries if q.strip()]
 
         if len(sub_queries) <= 1:
             logger.debug("Single intent detected, falling back to action_classify_intent")
@@ -377,122 +471,13 @@ class ActionHandleMultiIntent(Action):
 
         # Limit to 3 intents to avoid overwhelming the user
         sub_queries = sub_queries[:3]
-        intents = []
-        responses = []
 
-        # Classify each sub-query
-        for query in sub_queries:
-            normalized_query = normalize_spelling(query)
-            cache_key = f"classify_{normalized_query}_none"
-            
-            if cache_key in query_cache and is_cache_valid(query_cache[cache_key]):
-                logger.debug(f"Cache hit for sub-query: {query}")
-                result = query_cache[cache_key]["result"]
-            else:
-                client = groq.Groq(api_key="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")
-                conversation_history = [
-                    event.get("text") for event in tracker.events[-4:] if event.get("event") == "user"
-                ]
-                intents_list = [
-                    "coconut_general", "climate_soils", "coconut_varieties", "cultivation_methods",
-                    "nutrient_management", "fertilizers", "inter_cultivation", "organic_manures"
-                ]
-                prompt = f"""
-                Classify the user's query into one of the following intents: {', '.join(intents_list)}.
-                Rules:
-                - Yellowing leaves, nutrient deficiencies (e.g., nitrogen, phosphorus) → 'nutrient_management'.
-                - Nursery setup, seed/nut selection, planting → 'cultivation_methods'.
-                - Fertilizers, urea, potash, nutrients → 'fertilizers'.
-                - Coconut varieties, hybrids, breeds → 'coconut_varieties'.
-                - Climate, weather, soil types → 'climate_soils'.
-                - Area, productivity, research (e.g., Ambajipeta) → 'coconut_general'.
-                - Intercrops, plowing, weed control → 'inter_cultivation'.
-                - Organic manures, compost → 'organic_manures'.
-                If ambiguous, return 'ambiguous' with a clarifying question.
-                Treat synonyms (e.g., 'hybrid'/'variety', 'compost'/'manure') as equivalent.
-                Response in JSON: {{'intent': str, 'clarifying_question': str (optional)}}.
-
-                Conversation history: {conversation_history}
-                User query: {query}
-                """
-                try:
-                    response = client.chat.completions.create(
-                        model="llama3-70b-8192",
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=0.3,
-                        max_tokens=100
-                    )
-                    result = json.loads(response.choices[0].message.content)
-                    query_cache[cache_key] = {"result": result, "timestamp": datetime.now()}
-                except Exception as e:
-                    logger.error(f"Error classifying sub-query {query}: {e}")
-                    result = {"intent": "ambiguous", "clarifying_question": "Could you clarify this part of your question?"}
+        conversation_history = [
+            event.get("text") for event in tracker.events[-4:] if event.get("event") == "user"
+        ]
+
+        intents, responses = await self.answer_sub_queries(sub_queries, conversation_history)
 
-            intent = result.get("intent")
-            if intent != "ambiguous" and intent not in intents:
-                intents.append(intent)
-                # Generate answer for this intent
-                cache_key = f"answer_{intent}_{normalized_query}"
-                if cache_key in query_cache and is_cache_valid(query_cache[cache_key]):
-                    answer = query_cache[cache_key]["result"]
-                else:
-                    data = {
-                        "coconut_general": {
-                            "overview": "Our state cultivates coconuts on 1.17 lakh hectares, ranking 4th in area after Kerala, Tamil Nadu, and Karnataka, and 1st in productivity.",
-                            "research": "Research at Ambajipeta Horticultural Research Station spans 70 years."
-                        },
-                        "climate_soils": {
-                            "climate": "Coastal areas with 1000-2000 mm rainfall and high humidity are ideal.",
-                            "soils": "Fertile delta lands or gravelly/red soils with irrigation and drainage are suitable."
-                        },
-                        "coconut_varieties": {
-                            "East Coast Tall": "Yields 75-100 nuts/year, 146g copra, 64% oil, fruits in 7 years.",
-                            "Godavari Ganga": "Hybrid developed in 1991 at Ambajipeta, yields 140 nuts/year, 150g copra, 68% oil, fruits in 4 years."
-                        },
-                        "cultivation_methods": {
-                            "seed_selection": "Select nuts from 15-40-year-old trees yielding 100 nuts/year with 150g copra.",
-                            "nursery": "Use light upland soils, plant nuts 30 cm between rows."
-                        },
-                        "nutrient_management": {
-                            "phosphorus": "Strengthens seedling bases and leaf formation.",
-                            "deficiencies": "Nitrogen: Yellow leaves, stunted growth."
-                        },
-                        "fertilizers": {
-                            "young_trees": "For 1-4 years: 0.5kg urea + 1kg super phosphate + 1kg potash + 20kg manure/year/tree.",
-                            "application": "Apply in two splits (June-July, September-October)."
-                        },
-                        "inter_cultivation": {
-                            "plowing": "Plow rows twice yearly to control weeds.",
-                            "intercrops": "Grow banana, cocoa, or groundnut."
-                        },
-                        "organic_manures": {
-                            "preparation": "Convert 16 tonnes/hectare of coconut waste into compost.",
-                            "benefits": "Retains moisture, improves soil properties."
-                        }
-                    }
-                    prompt = f"""
-                    Answer the query using ONLY the provided data for intent '{intent}'. Use concise, natural language (1-2 sentences, up to 5 if needed). Use conversation history for context. Treat synonyms (e.g., 'hybrid'/'variety', 'compost'/'manure') as equivalent.
-
-                    Conversation history: {conversation_history}
-                    Data: {data.get(intent, 'No data available.')}
-                    User query: {query}
-                    """
-                    try:
-                        response = client.chat.completions.create(
-                            model="llama3-70b-8192",
-                            messages=[{"role": "user", "content": prompt}],
-                            temperature=0.3,
-                            max_tokens=500
-                        )
-                        answer = response.choices[0].message.content.strip()
-                        query_cache[cache_key] = {"result": answer, "timestamp": datetime.now()}
-                    except Exception as e:
-                        logger.error(f"Error answering sub-query {query}: {e}")
-                        answer = f"Sorry, I couldn't process this part about {intent}. Try asking separately!"
-                responses.append(f"**{intent.replace('_', ' ').title()}**: {answer}")
-            elif intent == "ambiguous":
-                responses.append(f"For '{query}': {result.get('clarifying_question', 'Please clarify this part.')}")
-        
         # Combine responses
         if responses:
             combined_response = "\n".join(responses)
@@ -500,4 +485,177 @@ class ActionHandleMultiIntent(Action):
             return [{"event": "slot", "name": "multi_intents", "value": intents}]
         else:
             dispatcher.utter_message(text="I couldn't understand your query. Please specify topics like varieties or fertilizers.")
-            return []
\ No newline at end of file
+            return []
+
+    async def answer_sub_queries(
+        self, sub_queries: List[Text], conversation_history: List[Text]
+    ) -> Tuple[List[Text], List[Text]]:
+        """Classify and answer sub-queries concurrently, returning (intents, responses) in query order.
+
+        Parts that are still running when MULTI_INTENT_DEADLINE expires are reported as timed out.
+        """
+        deadline = asyncio.get_running_loop().time() + MULTI_INTENT_DEADLINE
+        knowledge_base = get_knowledge_base()
+        with timed_stage(self.name(), "normalize"):
+            normalized_queries = [normalize_spelling(query) for query in sub_queries]
+
+        # Classify with cache, keywords and the local model first; only the rest go to the LLM
+        with timed_stage(self.name(), "classify_without_llm"):
+            results = list(await asyncio.gather(*(self._classify_without_llm(nq) for nq in normalized_queries)))
+        pending = [i for i, result in enumerate(results) if result is None]
+        with timed_stage(self.name(), "classify_llm"):
+            if len(pending) > 1 and MULTI_INTENT_BATCH_CLASSIFY:
+                batch = await gather_until(
+                    [self._classify_batch([sub_queries[i] for i in pending], [normalized_queries[i] for i in pending], conversation_history)],
+                    deadline,
+                )
+                llm_results = batch[0] or [None] * len(pending)
+            else:
+                llm_results = await gather_until(
+                    [self._classify_with_llm(sub_queries[i], normalized_queries[i], conversation_history) for i in pending],
+                    deadline,
+                )
+        for i, result in zip(pending, llm_results):
+            results[i] = result
+
+        # Answer each distinct intent once, for the first sub-query that asked about it
+        intents = []
+        to_answer = []
+        for i, result in enumerate(results):
+            intent = result.get("intent") if result is not None else None
+            if intent is not None and intent != "ambiguous" and intent not in intents:
+                intents.append(intent)
+                to_answer.append(i)
+        with timed_stage(self.name(), "answer"):
+            answers = await gather_until(
+                [
+                    self._answer(results[i]["intent"], sub_queries[i], normalized_queries[i], conversation_history, knowledge_base)
+                    for i in to_answer
+                ],
+                deadline,
+            )
+        answer_by_index = dict(zip(to_answer, answers))
+
+        responses = []
+        for i, query in enumerate(sub_queries):
+            result = results[i]
+            if result is None:
+                FALLBACKS.inc(action=self.name(), reason="timeout")
+                responses.append(f"For '{query}': {SUB_QUERY_TIMEOUT_MESSAGE}")
+            elif i in answer_by_index:
+                intent = result["intent"]
+                answer = answer_by_index[i]
+                if answer is None:
+                    FALLBACKS.inc(action=self.name(), reason="timeout")
+                    answer = SUB_QUERY_TIMEOUT_MESSAGE
+                responses.append(f"**{intent.replace('_', ' ').title()}**: {answer}")
+            elif result.get("intent") == "ambiguous":
+                responses.append(f"For '{query}': {result.get('clarifying_question', 'Please clarify this part.')}")
+        return intents, responses
+
+    async def _classify_without_llm(self, normalized_query: Text) -> Optional[Dict[Text, Any]]:
+        result = record_cache_lookup("classify", classify_cache.get(f"classify_{normalized_query}_none"))
+        precomputed = None
+        if result is None:
+            precomputed = record_cache_lookup("precomputed_intent", precomputed_classification(normalized_query))
+        if result is not None:
+            INTENT_SOURCES.inc(source="cache")
+        elif precomputed is not None:
+            result = precomputed
+            INTENT_SOURCES.inc(source="precomputed")
+        else:
+            # Keyword-based pre-check, shared with ActionClassifyIntent
+            matched_intents = keyword_matcher.matched_intents(normalized_query)
+            if len(matched_intents) == 1:
+                result = {"intent": matched_intents[0]}
+                INTENT_SOURCES.inc(source="keyword")
+            else:
+                result = await run_cpu_bound(classify_locally, normalized_query)
+                if result is not None:
+                    INTENT_SOURCES.inc(source="local_classifier")
+        if result is not None:
+            logger.debug("Cache, precomputed, keyword or local classifier hit for sub-query: %s: %s", normalized_query, result)
+        return result
+
+    async def _classify_with_llm(
+        self, query: Text, normalized_query: Text, conversation_history: List[Text]
+    ) -> Dict[Text, Any]:
+        prompt = SUB_QUERY_CLASSIFY_PROMPT.render(conversation_history, query=query)
+        try:
+            cache_key = f"classify_{normalized_query}_none"
+            raw_response = await llm_singleflight.do(
+                cache_key, lambda: get_llm_client().complete(prompt.text, max_tokens=100)
+            )
+            result = json.loads(raw_response)
+            if not is_valid_classification(result):
+                raise ValueError(f"expected a JSON classification, got: {raw_response}")
+            INTENT_SOURCES.inc(source="llm")
+            classify_cache.set(cache_key, result)
+        except Exception as e:
+            logger.error("Error classifying sub-query %s: %s", query, e)
+            FALLBACKS.inc(action=self.name(), reason="llm_error")
+            result = {"intent": "ambiguous", "clarifying_question": "Could you clarify this part of your question?"}
+        return result
+
+    async def _classify_batch(
+        self, queries: List[Text], normalized_queries: List[Text], conversation_history: List[Text]
+    ) -> List[Dict[Text, Any]]:
+        """Classify several sub-queries with a single LLM call returning a JSON array."""
+        max_query_tokens = SUB_QUERY_BATCH_CLASSIFY_PROMPT.max_query_tokens
+        numbered_queries = "\n".join(
+            f"{n}. {truncate_tokens(query, max_query_tokens)}" for n, query in enumerate(queries, start=1)
+        )
+        prompt = SUB_QUERY_BATCH_CLASSIFY_PROMPT.render(conversation_history, queries=numbered_queries)
+        try:
+            raw_response = await llm_singleflight.do(
+                "classify_batch_" + "|".join(normalized_queries),
+                lambda: get_llm_client().complete(prompt.text, max_tokens=100 * len(queries)),
+            )
+            results = json.loads(raw_response)
+            if (
+                not isinstance(results, list)
+                or len(results) != len(queries)
+                or not all(is_valid_classification(result) for result in results)
+            ):
+                raise ValueError(f"expected a JSON array of {len(queries)} classifications, got: {raw_response}")
+            INTENT_SOURCES.inc(len(results), source="llm")
+            for normalized_query, result in zip(normalized_queries, results):
+                classify_cache.set(f"classify_{normalized_query}_none", result)
+        except Exception as e:
+            logger.error("Error classifying sub-queries %s: %s", queries, e)
+            FALLBACKS.inc(len(queries), action=self.name(), reason="llm_error")
+            results = [
+                {"intent": "ambiguous", "clarifying_question": "Could you clarify this part of your question?"}
+                for _ in queries
+            ]
+        return results
+
+    async def _answer(
+        self,
+        intent: Text,
+        query: Text,
+        normalized_query: Text,
+        conversation_history: List[Text],
+        knowledge_base: KnowledgeBase,
+    ) -> Text:
+        cache_key = f"answer_{intent}_{normalized_query}"
+        answer = record_cache_lookup("answer", answer_cache.get(cache_key))
+        if answer is None and intent in knowledge_base:
+            answer = record_cache_lookup("precomputed_answer", precomputed_answer(intent, normalized_query, knowledge_base))
+        if answer is not None:
+            return answer
+        if intent in knowledge_base and not get_llm_client().available:
+            FALLBACKS.inc(action=self.name(), reason="llm_unavailable")
+            return get_retriever().retrieve(intent, query).fallback_answer
+        facts = get_retriever().select_facts(intent, query)[0] if intent in knowledge_base else 'No data available.'
+        prompt = SUB_QUERY_ANSWER_PROMPT.render(conversation_history, intent=intent, data=str(facts), query=query)
+        try:
+            answer = (await llm_singleflight.do(
+                cache_key, lambda: get_llm_client().complete(prompt.text, max_tokens=500)
+            )).strip()
+            answer_cache.set(cache_key, answer)
+        except Exception as e:
+            logger.error("Error answering sub-query %s: %s", query, e)
+            FALLBACKS.inc(action=self.name(), reason="llm_error")
+            answer = f"Sorry, I couldn't process this part about {intent}. Try asking separately!"
+        return answer
@@ -0,0 +1,145 @@
+"""Read-only store of precomputed intents and answers, memory-mapped by the action server.
+
+Built by `python -m actions.precompute` from the data/nlu.yml questions. Keys are normalized
+queries (normalize_spelling of the lowercased text), the same text the caches are keyed on.
+
+File layout (little-endian):
+    header   magic b"FVPA", version u16, reserved u16, knowledge-base fingerprint (20 bytes), count u32
+    index    count x (key hash u64, offset u32, length u32), sorted by key hash
+    records  UTF-8 "key \\0 intent \\0 answer" at the given offsets
+
+A lookup is a binary search over the index, reading only the pages it touches.
+"""
+from typing import List, NamedTuple, Optional, Text, Tuple
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+
+from actions.nlu_data import PROJECT_ROOT
+
+logger = logging.getLogger(__name__)
+
+PRECOMPUTED_ANSWERS = os.environ.get("PRECOMPUTED_ANSWERS", "true").lower() == "true"
+PRECOMPUTED_ANSWERS_PATH = os.environ.get(
+    "PRECOMPUTED_ANSWERS_PATH", os.path.join(PROJECT_ROOT, "models", "precomputed_answers.bin")
+)
+
+MAGIC = b"FVPA"
+VERSION = 1
+HEADER = struct.Struct("<4sHH20sI")
+INDEX_ENTRY = struct.Struct("<QII")
+
+
+class PrecomputedEntry(NamedTuple):
+    intent: Text
+    answer: Text
+
+
+def key_hash(key: Text) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def write_answer_store(path: Text, entries: List[Tuple[Text, Text, Text]], kb_fingerprint: Text) -> None:
+    """Write (key, intent, answer) entries atomically; the last entry wins for a repeated key."""
+    records = {key: (intent, answer) for key, intent, answer in entries}
+    ordered = sorted(records, key=key_hash)
+    data_start = HEADER.size + INDEX_ENTRY.size * len(ordered)
+    index, blobs, offset = [], [], data_start
+    for key in ordered:
+        intent, answer = records[key]
+        blob = "\0".join((key, intent, answer)).encode("utf-8")
+        index.append(INDEX_ENTRY.pack(key_hash(key), offset, len(blob)))
+        blobs.append(blob)
+        offset += len(blob)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, bytes.fromhex(kb_fingerprint), len(ordered)))
+        f.writelines(index)
+        f.writelines(blobs)
+    # Running servers keep their mapping of the old file until they reopen it
+    os.replace(tmp_path, path)
+
+
+class AnswerStore:
+    def __init__(self, path: Text) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, fingerprint, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} precomputed answer store")
+        self.kb_fingerprint = fingerprint.hex()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _record(self, position: int) -> Tuple[int, int, int]:
+        return INDEX_ENTRY.unpack_from(self._map, HEADER.size + position * INDEX_ENTRY.size)
+
+    def get(self, key: Text) -> Optional[PrecomputedEntry]:
+        target = key_hash(key)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._record(middle)[0] < target:
+                low = middle + 1
+            else:
+                high = middle
+        # Equal hashes are adjacent; compare the stored key to rule out collisions
+        while low < self.count:
+            entry_hash, offset, length = self._record(low)
+            if entry_hash != target:
+                break
+            stored_key, intent, answer = self._map[offset:offset + length].decode("utf-8").split("\0", 2)
+            if stored_key == key:
+                return PrecomputedEntry(intent, answer)
+            low += 1
+        return None
+
+    def intent(self, key: Text) -> Optional[Text]:
+        entry = self.get(key)
+        return entry.intent if entry is not None else None
+
+    def answer(self, intent: Text, key: Text, kb_fingerprint: Text) -> Optional[Text]:
+        """The precomputed answer, if it was generated for this intent from the current knowledge base."""
+        if kb_fingerprint != self.kb_fingerprint:
+            return None
+        entry = self.get(key)
+        if entry is None or entry.intent != intent:
+            return None
+        return entry.answer
+
+    def close(self) -> None:
+        self._map.close()
+
+
+_answer_store: Optional[AnswerStore] = None
+_load_attempted = False
+_load_lock = threading.Lock()
+
+
+def get_answer_store() -> Optional[AnswerStore]:
+    """Memory-map the store once; returns None if it is disabled or has not been built."""
+    global _answer_store, _load_attempted
+    if _load_attempted:
+        return _answer_store
+    # The startup warm-up thread may be opening it concurrently
+    with _load_lock:
+        if not _load_attempted:
+            if PRECOMPUTED_ANSWERS and os.path.exists(PRECOMPUTED_ANSWERS_PATH):
+                try:
+                    _answer_store = AnswerStore(PRECOMPUTED_ANSWERS_PATH)
+                    logger.info("Mapped %s precomputed answers from %s", len(_answer_store), PRECOMPUTED_ANSWERS_PATH)
+                except (OSError, ValueError, struct.error) as e:
+                    logger.error("Could not open precomputed answers %s: %s", PRECOMPUTED_ANSWERS_PATH, e)
+            elif PRECOMPUTED_ANSWERS:
+                logger.info("No precomputed answers at %s", PRECOMPUTED_ANSWERS_PATH)
+            _load_attempted = True
+    return _answer_store
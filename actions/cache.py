@@ -0,0 +1,550 @@
+from typing import Any, Dict, List, Optional, Text, Tuple
+from collections import OrderedDict
+import abc
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+
+from actions.nlu_data import PROJECT_ROOT
+
+logger = logging.getLogger(__name__)
+
+# Limits and expiry per namespace (override via environment)
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CLASSIFY_CACHE_TTL = float(os.environ.get("CLASSIFY_CACHE_TTL", str(24 * 3600)))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", str(24 * 3600)))
+CACHE_SWEEP_INTERVAL = float(os.environ.get("CACHE_SWEEP_INTERVAL", "60"))
+
+# Shared backend selection: "memory" (per process), "sqlite" (shared on-disk file) or "redis"
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_SQLITE_PATH = os.environ.get("CACHE_SQLITE_PATH", os.path.join(PROJECT_ROOT, ".cache", "llm_cache.sqlite3"))
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+# Redis is called synchronously from the event loop, so a slow server must fail fast (a miss)
+CACHE_REDIS_TIMEOUT = float(os.environ.get("CACHE_REDIS_TIMEOUT", "0.1"))
+CACHE_WARM_START = int(os.environ.get("CACHE_WARM_START", "1000"))  # entries loaded into memory by the startup warm-up
+
+
+def estimate_size(key: Text, value: Any) -> int:
+    """Rough memory footprint of a cache entry in bytes."""
+    if isinstance(value, dict):
+        value_size = sys.getsizeof(value) + sum(
+            sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items()
+        )
+    else:
+        value_size = sys.getsizeof(value)
+    return sys.getsizeof(key) + value_size
+
+
+class CacheBackend(abc.ABC):
+    """Interface shared by all cache backends. Values must be JSON-serializable."""
+
+    namespace: Text = ""
+    ttl: float = 0.0
+
+    @abc.abstractmethod
+    def get(self, key: Text) -> Optional[Any]:
+        ...
+
+    @abc.abstractmethod
+    def set(self, key: Text, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, key: Text) -> None:
+        ...
+
+    def get_with_ttl(self, key: Text) -> Optional[Tuple[Any, float]]:
+        """Return (value, remaining_ttl), or None if missing or expired."""
+        value = self.get(key)
+        return None if value is None else (value, self.ttl)
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def items(self, limit: int) -> List[Tuple[Text, Any, float]]:
+        """Return up to `limit` live (key, value, remaining_ttl) entries, newest first."""
+        return []
+
+    def sweep(self) -> int:
+        """Drop expired entries and return how many were removed."""
+        return 0
+
+    def warm(self, limit: int) -> int:
+        """Preload up to `limit` entries into memory and return how many were loaded."""
+        return 0
+
+    def stats(self) -> Dict[Text, Any]:
+        return {"namespace": self.namespace}
+
+    def _start_sweeper(self, interval: float) -> None:
+        self._sweep_interval = interval
+        _fork_sensitive.add(self)
+        self._stop = threading.Event()
+        self._sweeper = threading.Thread(
+            target=self._sweep_loop, args=(interval,), name=f"cache-sweeper-{self.namespace}", daemon=True
+        )
+        self._sweeper.start()
+
+    def _sweep_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error("Cache sweep failed for '%s': %s", self.namespace, e)
+
+    def _after_fork(self) -> None:
+        """Called in a forked child, where only the forking thread survives."""
+        stop = getattr(self, "_stop", None)
+        if stop is not None and not stop.is_set():
+            self._start_sweeper(self._sweep_interval)
+
+    def close(self) -> None:
+        stop = getattr(self, "_stop", None)
+        if stop is not None:
+            stop.set()
+
+
+class TTLCache(CacheBackend):
+    """Thread-safe LRU cache bounded by entry count and bytes, with per-entry TTL."""
+
+    def __init__(
+        self,
+        namespace: Text,
+        ttl: float,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+        sweep_interval: Optional[float] = CACHE_SWEEP_INTERVAL,
+    ) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Text, Tuple[Any, float, int]]" = OrderedDict()  # key -> (value, expires_at, size)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # Recreate the lock in forked workers even when no sweeper runs
+        _fork_sensitive.add(self)
+        if sweep_interval:
+            self._start_sweeper(sweep_interval)
+
+    def _after_fork(self) -> None:
+        # Another thread (a sweeper or the warm-up) may have held the lock when the parent forked,
+        # and it would never be released in the child
+        self._lock = threading.Lock()
+        super()._after_fork()
+
+    def get(self, key: Text) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        entry = self.get_with_ttl(key)
+        return entry[0] if entry is not None else None
+
+    def get_with_ttl(self, key: Text) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                self._remove(key, size)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value, expires_at - now
+
+    def set(self, key: Text, value: Any, ttl: Optional[float] = None) -> None:
+        size = estimate_size(key, value)
+        if size > self.max_bytes:
+            logger.warning("Not caching oversized entry in '%s' (%s bytes)", self.namespace, size)
+            return
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def delete(self, key: Text) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._remove(key, entry[2])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Text, size: int) -> None:
+        del self._entries[key]
+        self._bytes -= size
+
+    def items(self, limit: int) -> List[Tuple[Text, Any, float]]:
+        now = time.monotonic()
+        with self._lock:
+            live = [(key, value, expires_at - now) for key, (value, expires_at, _) in reversed(self._entries.items())
+                    if expires_at > now]
+        return live[:limit]
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [(key, entry[2]) for key, entry in self._entries.items() if entry[1] <= now]
+            for key, size in expired:
+                self._remove(key, size)
+            self.expirations += len(expired)
+        if expired:
+            logger.debug("Swept %s expired entries from '%s' cache", len(expired), self.namespace)
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[Text, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class SQLiteCache(CacheBackend):
+    """On-disk cache in a SQLite file (WAL mode) that several worker processes can share."""
+
+    def __init__(
+        self,
+        namespace: Text,
+        ttl: float,
+        path: Text = CACHE_SQLITE_PATH,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        sweep_interval: Optional[float] = CACHE_SWEEP_INTERVAL,
+    ) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        _fork_sensitive.add(self)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expiry ON cache (namespace, expires_at)")
+        if sweep_interval:
+            self._start_sweeper(sweep_interval)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: Text) -> Optional[Any]:
+        entry = self.get_with_ttl(key)
+        return entry[0] if entry is not None else None
+
+    def get_with_ttl(self, key: Text) -> Optional[Tuple[Any, float]]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+        now = time.time()
+        if row is None or row[1] <= now:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0]), row[1] - now
+
+    def set(self, key: Text, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttl)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, created_at) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, key, json.dumps(value), expires_at, now),
+        )
+
+    def delete(self, key: Text) -> None:
+        self._conn().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def sweep(self) -> int:
+        """Delete expired rows and trim the namespace to `max_entries`, oldest first."""
+        conn = self._conn()
+        removed = conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, time.time())
+        ).rowcount
+        removed += conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key NOT IN ("
+            "SELECT key FROM cache WHERE namespace = ? ORDER BY created_at DESC LIMIT ?)",
+            (self.namespace, self.namespace, self.max_entries),
+        ).rowcount
+        return removed
+
+    def items(self, limit: int) -> List[Tuple[Text, Any, float]]:
+        now = time.time()
+        rows = self._conn().execute(
+            "SELECT key, value, expires_at FROM cache WHERE namespace = ? AND expires_at > ? "
+            "ORDER BY created_at DESC LIMIT ?",
+            (self.namespace, now, limit),
+        ).fetchall()
+        return [(key, json.loads(value), expires_at - now) for key, value, expires_at in rows]
+
+    def stats(self) -> Dict[Text, Any]:
+        entries = self._conn().execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "backend": "sqlite",
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _after_fork(self) -> None:
+        # A connection inherited from the parent must not be used by the child
+        self._local = threading.local()
+        super()._after_fork()
+
+    def close(self) -> None:
+        super().close()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class RedisCache(CacheBackend):
+    """Cache stored in Redis (or any Redis-compatible server) with native key expiry.
+
+    A pre-built client can be passed in, e.g. `fakeredis.FakeRedis()` as a local stand-in.
+    """
+
+    def __init__(self, namespace: Text, ttl: float, url: Text = CACHE_REDIS_URL, client: Any = None) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("CACHE_BACKEND=redis requires the 'redis' package (pip install redis)") from e
+            client = redis.Redis.from_url(
+                url, socket_timeout=CACHE_REDIS_TIMEOUT, socket_connect_timeout=CACHE_REDIS_TIMEOUT
+            )
+        self._client = client
+
+    def _key(self, key: Text) -> Text:
+        return f"farmvaidya:{self.namespace}:{key}"
+
+    def get(self, key: Text) -> Optional[Any]:
+        raw = self._client.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def get_with_ttl(self, key: Text) -> Optional[Tuple[Any, float]]:
+        pipeline = self._client.pipeline(transaction=False)
+        pipeline.get(self._key(key))
+        pipeline.pttl(self._key(key))
+        raw, remaining = pipeline.execute()
+        # pttl is -2 if the key expired in between and -1 if it has no expiry
+        if raw is None or remaining == -2:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw), remaining / 1000 if remaining > 0 else self.ttl
+
+    def set(self, key: Text, value: Any, ttl: Optional[float] = None) -> None:
+        seconds = max(1, int(ttl if ttl is not None else self.ttl))
+        self._client.set(self._key(key), json.dumps(value), ex=seconds)
+
+    def delete(self, key: Text) -> None:
+        self._client.delete(self._key(key))
+
+    def clear(self) -> None:
+        keys = list(self._client.scan_iter(match=self._key("*")))
+        if keys:
+            self._client.delete(*keys)
+
+    def items(self, limit: int) -> List[Tuple[Text, Any, float]]:
+        """SCAN the namespace; Redis keeps no insertion time, so the longest remaining TTL counts as newest."""
+        keys = list(self._client.scan_iter(match=self._key("*"), count=1000))
+        if not keys:
+            return []
+        pipeline = self._client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.pttl(key)
+        # -2: expired since the scan, -1: no expiry (not written by this cache)
+        live = sorted(
+            ((remaining, key) for key, remaining in zip(keys, pipeline.execute()) if remaining > 0),
+            reverse=True,
+        )[:limit]
+        if not live:
+            return []
+        values = self._client.mget([key for _, key in live])
+        prefix = self._key("")
+        entries = []
+        for (remaining, key), raw in zip(live, values):
+            if raw is None:
+                continue
+            if isinstance(key, bytes):
+                key = key.decode("utf-8")
+            entries.append((key[len(prefix):], json.loads(raw), remaining / 1000))
+        return entries
+
+    def stats(self) -> Dict[Text, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class TieredCache(CacheBackend):
+    """In-process TTLCache in front of a shared backend; reads fall through and repopulate memory."""
+
+    def __init__(self, memory: TTLCache, shared: CacheBackend, warm_start: int = 0) -> None:
+        self.namespace = memory.namespace
+        self.ttl = memory.ttl
+        self.memory = memory
+        self.shared = shared
+        if warm_start:
+            self.warm(warm_start)
+
+    def warm(self, limit: int) -> int:
+        """Load the newest live entries from the shared backend into memory."""
+        try:
+            entries = self.shared.items(limit)
+        except Exception as e:
+            logger.error("Cache warm start failed for '%s': %s", self.namespace, e)
+            return 0
+        for key, value, remaining in reversed(entries):
+            self.memory.set(key, value, ttl=remaining)
+        logger.info("Warmed '%s' cache with %s entries", self.namespace, len(entries))
+        return len(entries)
+
+    def get(self, key: Text) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        try:
+            entry = self.shared.get_with_ttl(key)
+        except Exception as e:
+            logger.error("Shared cache read failed for '%s': %s", self.namespace, e)
+            return None
+        if entry is None:
+            return None
+        # Keep the memory copy no longer than the shared entry lives
+        value, remaining = entry
+        self.memory.set(key, value, ttl=remaining)
+        return value
+
+    def set(self, key: Text, value: Any, ttl: Optional[float] = None) -> None:
+        self.memory.set(key, value, ttl)
+        try:
+            self.shared.set(key, value, ttl)
+        except Exception as e:
+            logger.error("Shared cache write failed for '%s': %s", self.namespace, e)
+
+    def delete(self, key: Text) -> None:
+        self.memory.delete(key)
+        self.shared.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.shared.clear()
+
+    def stats(self) -> Dict[Text, Any]:
+        return {"namespace": self.namespace, "memory": self.memory.stats(), "shared": self.shared.stats()}
+
+    def close(self) -> None:
+        self.memory.close()
+        self.shared.close()
+
+
+# Caches with threads, locks or connections to recreate in forked worker processes (actions/server.py)
+_fork_sensitive: "weakref.WeakSet[CacheBackend]" = weakref.WeakSet()
+
+
+def _reinit_after_fork() -> None:
+    for cache in list(_fork_sensitive):
+        cache._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
+
+
+def create_cache(
+    namespace: Text,
+    ttl: float,
+    backend: Text = CACHE_BACKEND,
+    sqlite_path: Optional[Text] = None,
+    redis_client: Any = None,
+) -> CacheBackend:
+    """Build the cache for a namespace according to the configured backend.
+
+    sqlite_path and redis_client override CACHE_SQLITE_PATH and the client built from
+    CACHE_REDIS_URL, e.g. a temporary file or `fakeredis.FakeRedis()`.
+    """
+    memory = TTLCache(namespace, ttl=ttl)
+    if backend == "memory":
+        return memory
+    if backend == "sqlite":
+        return TieredCache(memory, SQLiteCache(namespace, ttl=ttl, path=sqlite_path or CACHE_SQLITE_PATH))
+    if backend == "redis":
+        return TieredCache(memory, RedisCache(namespace, ttl=ttl, client=redis_client))
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+
+
+# Separate namespaces for intent classification and answer generation results
+classify_cache = create_cache("classify", ttl=CLASSIFY_CACHE_TTL)
+answer_cache = create_cache("answer", ttl=ANSWER_CACHE_TTL)
@@ -0,0 +1,60 @@
+"""Optional process pool for the CPU-bound stages of the async actions.
+
+With CPU_POOL_WORKERS=0 (the default) run_cpu_bound() simply calls the function. Handing a
+call to another process costs a pickle round trip of roughly 0.1-0.3 ms, so the pool only pays
+off for stages slower than that, or when a single action-server process has to use more cores.
+Running several server processes (`python -m actions.server --workers N`) is the first choice.
+
+On Linux the pool processes are forked from the server, so they inherit the knowledge base,
+indexes and local classifier it has already loaded. Functions and arguments must be picklable:
+pass module-level functions, not bound methods or lambdas.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+import asyncio
+import atexit
+import multiprocessing
+import os
+import threading
+
+CPU_POOL_WORKERS = int(os.environ.get("CPU_POOL_WORKERS", "0"))
+
+T = TypeVar("T")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_cpu_pool() -> Optional[ProcessPoolExecutor]:
+    """The process pool of this process, created on first use; None when disabled."""
+    global _pool, _pool_pid
+    if CPU_POOL_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        # A pool inherited through fork belongs to the parent
+        if _pool is None or _pool_pid != os.getpid():
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            _pool = ProcessPoolExecutor(max_workers=CPU_POOL_WORKERS, mp_context=context)
+            _pool_pid = os.getpid()
+    return _pool
+
+
+async def run_cpu_bound(func: Callable[..., T], *args: Any) -> T:
+    """Run func(*args) in the process pool if one is configured, otherwise inline."""
+    pool = get_cpu_pool()
+    if pool is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+
+
+def shutdown_cpu_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+atexit.register(shutdown_cpu_pool)
@@ -0,0 +1,219 @@
+"""Local CPU-only intent classifier used before escalating to the LLM.
+
+Word 1-2 grams and character 3-5 grams, TF-IDF weighted, with a softmax regression in NumPy.
+Retrain from data/nlu.yml and write the model artifact with:
+
+    python -m actions.intent_classifier --nlu data/nlu.yml --out models/intent_classifier.npz --eval
+"""
+from typing import Dict, List, Optional, Text, Tuple
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+
+import numpy as np
+
+from actions.keywords import INTENTS
+from actions.nlu_data import PROJECT_ROOT, load_nlu_examples
+from actions.normalizer import normalize_spelling
+
+logger = logging.getLogger(__name__)
+
+LOCAL_CLASSIFIER_PATH = os.environ.get(
+    "LOCAL_CLASSIFIER_PATH", os.path.join(PROJECT_ROOT, "models", "intent_classifier.npz")
+)
+LOCAL_CLASSIFIER_THRESHOLD = float(os.environ.get("LOCAL_CLASSIFIER_THRESHOLD", "0.7"))
+
+# Out-of-scope examples are learned as their own class so they are escalated, never guessed
+TRAINING_LABELS = INTENTS + ["none"]
+
+
+def extract_features(text: Text) -> Dict[Text, float]:
+    """Term counts for word uni/bigrams and character n-grams of the normalized text."""
+    words = normalize_spelling(text.lower()).split()
+    features: Dict[Text, float] = {}
+    grams = [f"w:{w}" for w in words] + [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        for n in (3, 4, 5):
+            grams.extend(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+    for gram in grams:
+        features[gram] = features.get(gram, 0.0) + 1.0
+    return features
+
+
+class LocalIntentClassifier:
+    def __init__(self, vocab: List[Text], idf: np.ndarray, weights: np.ndarray, bias: np.ndarray, labels: List[Text]) -> None:
+        self.vocab = {term: i for i, term in enumerate(vocab)}
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.labels = labels
+
+    def _vectorize(self, text: Text) -> Tuple[np.ndarray, np.ndarray]:
+        features = extract_features(text)
+        indices = [self.vocab[f] for f in features if f in self.vocab]
+        if not indices:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        idx = np.array(indices, dtype=np.int64)
+        counts = np.array([features[f] for f in features if f in self.vocab], dtype=np.float32)
+        values = (1.0 + np.log(counts)) * self.idf[idx]
+        return idx, values / np.linalg.norm(values)
+
+    def predict_proba(self, text: Text) -> np.ndarray:
+        idx, values = self._vectorize(text)
+        logits = self.bias + values @ self.weights[idx]
+        logits = np.exp(logits - logits.max())
+        return logits / logits.sum()
+
+    def predict(self, text: Text) -> Tuple[Text, float]:
+        """Return the most likely intent and its probability."""
+        probs = self.predict_proba(text)
+        best = int(np.argmax(probs))
+        return self.labels[best], float(probs[best])
+
+    @classmethod
+    def train(
+        cls,
+        examples: Dict[Text, List[Text]],
+        labels: List[Text] = TRAINING_LABELS,
+        epochs: int = 300,
+        learning_rate: float = 10.0,
+        l2: float = 1e-4,
+    ) -> "LocalIntentClassifier":
+        texts = [text for label in labels for text in examples.get(label, [])]
+        targets = np.array([i for i, label in enumerate(labels) for _ in examples.get(label, [])])
+        feature_rows = [extract_features(text) for text in texts]
+        vocab = sorted({f for row in feature_rows for f in row})
+        index = {term: i for i, term in enumerate(vocab)}
+
+        doc_freq = np.zeros(len(vocab), dtype=np.float32)
+        for row in feature_rows:
+            doc_freq[[index[f] for f in row]] += 1
+        idf = (np.log((1 + len(texts)) / (1 + doc_freq)) + 1.0).astype(np.float32)
+
+        X = np.zeros((len(texts), len(vocab)), dtype=np.float32)
+        for r, row in enumerate(feature_rows):
+            cols = [index[f] for f in row]
+            X[r, cols] = (1.0 + np.log(np.array(list(row.values()), dtype=np.float32))) * idf[cols]
+        X /= np.linalg.norm(X, axis=1, keepdims=True)
+
+        Y = np.eye(len(labels), dtype=np.float32)[targets]
+        W = np.zeros((len(vocab), len(labels)), dtype=np.float32)
+        b = np.zeros(len(labels), dtype=np.float32)
+        for _ in range(epochs):
+            logits = X @ W + b
+            logits = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs = logits / logits.sum(axis=1, keepdims=True)
+            grad = (probs - Y) / len(texts)
+            W -= learning_rate * (X.T @ grad + l2 * W)
+            b -= learning_rate * grad.sum(axis=0)
+        return cls(vocab, idf, W, b, list(labels))
+
+    def save(self, path: Text) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        vocab = sorted(self.vocab, key=self.vocab.get)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                vocab=np.array(vocab),
+                idf=self.idf,
+                weights=self.weights.astype(np.float16),
+                bias=self.bias,
+                labels=np.array(self.labels),
+            )
+
+    @classmethod
+    def load(cls, path: Text) -> "LocalIntentClassifier":
+        with np.load(path, allow_pickle=False) as artifact:
+            return cls(
+                artifact["vocab"].tolist(),
+                artifact["idf"],
+                artifact["weights"].astype(np.float32),
+                artifact["bias"],
+                artifact["labels"].tolist(),
+            )
+
+
+_local_classifier: Optional[LocalIntentClassifier] = None
+_load_attempted = False
+_load_lock = threading.Lock()
+
+
+def get_local_classifier() -> Optional[LocalIntentClassifier]:
+    """Load the model artifact once; returns None if it has not been trained yet."""
+    global _local_classifier, _load_attempted
+    if _load_attempted:
+        return _local_classifier
+    # The startup warm-up thread may be loading it concurrently
+    with _load_lock:
+        if not _load_attempted:
+            if os.path.exists(LOCAL_CLASSIFIER_PATH):
+                start = time.perf_counter()
+                _local_classifier = LocalIntentClassifier.load(LOCAL_CLASSIFIER_PATH)
+                logger.info("Loaded local intent classifier in %.1f ms", (time.perf_counter() - start) * 1000)
+            else:
+                logger.warning("No local intent classifier at %s; every ambiguous query goes to the LLM", LOCAL_CLASSIFIER_PATH)
+            _load_attempted = True
+    return _local_classifier
+
+
+def classify_locally(text: Text, threshold: float = LOCAL_CLASSIFIER_THRESHOLD) -> Optional[Dict[Text, Text]]:
+    """Return {"intent": ...} if the local model is confident enough, otherwise None."""
+    classifier = get_local_classifier()
+    if classifier is None:
+        return None
+    intent, confidence = classifier.predict(text)
+    logger.debug("Local classifier: %s (%.2f) for %s", intent, confidence, text)
+    if confidence < threshold or intent not in INTENTS:
+        return None
+    return {"intent": intent}
+
+
+def evaluate(examples: Dict[Text, List[Text]], holdout: float, threshold: float, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    train: Dict[Text, List[Text]] = {}
+    test: List[Tuple[Text, Text]] = []
+    for label in TRAINING_LABELS:
+        items = list(examples.get(label, []))
+        rng.shuffle(items)
+        cut = max(1, int(len(items) * holdout))
+        test.extend((text, label) for text in items[:cut])
+        train[label] = items[cut:]
+    classifier = LocalIntentClassifier.train(train)
+    predictions = [(classifier.predict(text), label) for text, label in test]
+    correct = sum(1 for (intent, _), label in predictions if intent == label)
+    confident = [(intent, label) for (intent, conf), label in predictions if conf >= threshold]
+    confident_correct = sum(1 for intent, label in confident if intent == label)
+    print(f"held-out accuracy: {correct / len(test):.3f} on {len(test)} examples")
+    print(f"above threshold {threshold}: {len(confident) / len(test):.1%} of queries, "
+          f"precision {confident_correct / max(1, len(confident)):.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nlu", default=None, help="Path to the NLU training file (default: data/nlu.yml)")
+    parser.add_argument("--out", default=LOCAL_CLASSIFIER_PATH, help="Where to write the model artifact")
+    parser.add_argument("--eval", action="store_true", help="Report accuracy on a held-out split before training")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--threshold", type=float, default=LOCAL_CLASSIFIER_THRESHOLD)
+    args = parser.parse_args()
+
+    examples = load_nlu_examples(args.nlu)
+    if args.eval:
+        evaluate(examples, args.holdout, args.threshold)
+
+    start = time.perf_counter()
+    classifier = LocalIntentClassifier.train(examples)
+    classifier.save(args.out)
+    print(f"trained on {sum(len(examples.get(label, [])) for label in TRAINING_LABELS)} examples in "
+          f"{time.perf_counter() - start:.2f}s, {len(classifier.vocab)} features, "
+          f"{os.path.getsize(args.out) / 1024:.1f} KiB -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from typing import Dict, List, NamedTuple, Set, Text
+import re
+
+INTENTS = [
+    "coconut_general", "climate_soils", "coconut_varieties", "cultivation_methods",
+    "nutrient_management", "fertilizers", "inter_cultivation", "organic_manures"
+]
+
+# Keyword-based fallback for robust classification (using normalized forms)
+KEYWORD_MAP = {
+    "nutrient_management": ["yellow", "yellowing", "spathe", "deficiency", "nitrogen", "phosphorus", "potash", "potassium", "barren", "drop", "symptoms", "mineral"],
+    "cultivation_methods": ["nursery", "soil", "arrange", "planting", "seed", "seedling", "pit", "germination", "nut", "propagule"],
+    "fertilizers": ["fertilizer", "urea", "potash", "manure", "neem cake", "super phosphate", "nutrient", "chemical", "feed"],
+    "coconut_varieties": ["variety", "godavari ganga", "east coast tall", "double century", "gauthami ganga", "vasishta ganga", "vainateya ganga", "abhaya ganga", "hybrid", "breed", "cultivar", "strain", "type", "kind"],
+    "climate_soils": ["climate", "soil", "rainfall", "humidity", "temperature", "irrigation", "drainage", "weather", "environment", "conditions", "land", "ground", "earth"],
+    "coconut_general": ["cultivation", "area", "productivity", "district", "research", "ambajipeta", "yield increase", "research_station", "research center", "research institute", "facility"],
+    "inter_cultivation": ["intercrop", "plow", "weed", "banana", "cocoa", "companion crop"],
+    "organic_manures": ["manure", "compost", "vermicompost", "coconut waste", "green manure", "organic fertilizer"]
+}
+
+
+class KeywordHit(NamedTuple):
+    keyword: Text
+    start: int
+    end: int
+
+
+class KeywordMatcher:
+    """Finds keyword matches for all intents in one pass with a single compiled alternation.
+
+    Equivalent to searching each `\\bkeyword(s)?\\b` separately: a multi-word keyword that
+    matches also credits the intents of any shorter keywords it contains (e.g. "green manure"
+    also counts as "manure" for 'fertilizers').
+    """
+
+    def __init__(self, keyword_map: Dict[Text, List[Text]]) -> None:
+        self.intent_order = list(keyword_map)
+        self.keyword_intents: Dict[Text, Set[Text]] = {}
+        for intent, keywords in keyword_map.items():
+            for keyword in keywords:
+                self.keyword_intents.setdefault(keyword.lower(), set()).add(intent)
+
+        # Credit keywords nested inside longer ones, since the single pass only reports the longest
+        self.credits: Dict[Text, List[Text]] = {}
+        for keyword in self.keyword_intents:
+            contained = [
+                inner for inner in self.keyword_intents
+                if inner == keyword or re.search(rf"\b{re.escape(inner)}(s)?\b", keyword)
+            ]
+            self.credits[keyword] = contained
+
+        alternation = "|".join(re.escape(k) for k in sorted(self.keyword_intents, key=len, reverse=True))
+        self.pattern = re.compile(rf"\b({alternation})s?\b", re.IGNORECASE)
+
+    def match(self, text: Text) -> Dict[Text, List[KeywordHit]]:
+        """Return {intent: [KeywordHit, ...]} for every intent with at least one keyword in `text`."""
+        hits: Dict[Text, List[KeywordHit]] = {}
+        for m in self.pattern.finditer(text):
+            matched = m.group(1).lower()
+            for keyword in self.credits[matched]:
+                for intent in self.keyword_intents[keyword]:
+                    hits.setdefault(intent, []).append(KeywordHit(keyword, m.start(), m.end()))
+        return {intent: hits[intent] for intent in self.intent_order if intent in hits}
+
+    def matched_intents(self, text: Text) -> List[Text]:
+        return list(self.match(text))
+
+
+keyword_matcher = KeywordMatcher(KEYWORD_MAP)
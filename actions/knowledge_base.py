@@ -0,0 +1,81 @@
+from typing import Dict, Mapping, Optional, Text
+from types import MappingProxyType
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import yaml
+
+from actions.nlu_data import PROJECT_ROOT
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_BASE_PATH = os.environ.get("KNOWLEDGE_BASE_PATH", os.path.join(PROJECT_ROOT, "knowledge_base.yml"))
+KB_RELOAD_INTERVAL = float(os.environ.get("KB_RELOAD_INTERVAL", "5"))  # seconds between file change checks
+
+
+class KnowledgeBase:
+    """Read-only view of the structured coconut data, with per-intent text precomputed."""
+
+    def __init__(self, sections: Dict[Text, Dict[Text, Text]], mtime: float = 0.0) -> None:
+        self.mtime = mtime
+        # Identifies the content, e.g. to tell whether precomputed answers are still current
+        self.fingerprint = hashlib.sha1(json.dumps(sections, sort_keys=True).encode("utf-8")).hexdigest()
+        self.sections: Mapping[Text, Mapping[Text, Text]] = MappingProxyType({
+            sys.intern(intent): MappingProxyType({sys.intern(k): v for k, v in facts.items()})
+            for intent, facts in sections.items()
+        })
+        # Answer used when the LLM fails or its answer is rejected
+        self.fallback_text: Mapping[Text, Text] = MappingProxyType({
+            intent: " ".join(facts.values()) for intent, facts in sections.items()
+        })
+        # Section as it is pasted into prompts
+        self.prompt_text: Mapping[Text, Text] = MappingProxyType({
+            intent: str(dict(facts)) for intent, facts in sections.items()
+        })
+
+    def __contains__(self, intent: Text) -> bool:
+        return intent in self.sections
+
+    def get(self, intent: Text) -> Optional[Mapping[Text, Text]]:
+        return self.sections.get(intent)
+
+
+def load_knowledge_base(path: Text = KNOWLEDGE_BASE_PATH) -> KnowledgeBase:
+    mtime = os.stat(path).st_mtime
+    with open(path, encoding="utf-8") as f:
+        sections = yaml.safe_load(f)["knowledge_base"]
+    for intent, facts in sections.items():
+        if not isinstance(facts, dict) or not all(isinstance(v, str) for v in facts.values()):
+            raise ValueError(f"Knowledge base section '{intent}' must map fact names to strings")
+    return KnowledgeBase(sections, mtime)
+
+
+_knowledge_base: Optional[KnowledgeBase] = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """Return the current knowledge base, reloading it if the file has changed on disk."""
+    global _knowledge_base, _last_check
+    now = time.monotonic()
+    if _knowledge_base is not None and now - _last_check < KB_RELOAD_INTERVAL:
+        return _knowledge_base
+    with _lock:
+        _last_check = now
+        if _knowledge_base is None:
+            _knowledge_base = load_knowledge_base()
+            return _knowledge_base
+        try:
+            if os.stat(KNOWLEDGE_BASE_PATH).st_mtime != _knowledge_base.mtime:
+                _knowledge_base = load_knowledge_base()
+                logger.info("Reloaded knowledge base from %s", KNOWLEDGE_BASE_PATH)
+        except Exception as e:
+            # Keep serving the last good version
+            logger.error("Failed to reload knowledge base: %s", e)
+        return _knowledge_base
@@ -0,0 +1,286 @@
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Text, Tuple
+import asyncio
+import logging
+import os
+import random
+import time
+
+from actions.metrics import LLM_LATENCY, LLM_REQUESTS, LLM_TOKENS
+from actions.resilience import CircuitBreaker, CircuitOpenError, RateLimitedError, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Connection settings (override via environment, e.g. GROQ_BASE_URL=http://127.0.0.1:8008 for a local fake server)
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL")
+LLM_MODEL = os.environ.get("LLM_MODEL", "llama3-70b-8192")
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "20"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "32"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "64"))
+LLM_MAX_KEEPALIVE = int(os.environ.get("LLM_MAX_KEEPALIVE", "32"))
+
+# Client-side rate limit matched to the API quota (requests per minute, 0 disables); calls that
+# would wait longer than LLM_RATE_LIMIT_MAX_WAIT seconds for a slot use the fallback instead
+LLM_RATE_LIMIT_RPM = float(os.environ.get("LLM_RATE_LIMIT_RPM", "0"))
+LLM_RATE_LIMIT_BURST = int(os.environ.get("LLM_RATE_LIMIT_BURST", "5"))
+LLM_RATE_LIMIT_MAX_WAIT = float(os.environ.get("LLM_RATE_LIMIT_MAX_WAIT", "2"))
+# Circuit breaker: open after this many consecutive failures or calls slower than the SLO (seconds),
+# then probe the backend again after the cooldown (seconds)
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_SLO = float(os.environ.get("LLM_BREAKER_SLO", "5"))
+LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", "30"))
+
+if TYPE_CHECKING:
+    import groq
+
+
+def retryable_errors() -> Tuple[type, ...]:
+    """Errors worth retrying: network problems, timeouts, rate limits and 5xx responses."""
+    # groq is imported on first use; it is one of the slowest imports of the action server
+    import groq
+
+    return (groq.APIConnectionError, groq.RateLimitError, groq.InternalServerError)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds from the Retry-After header of a rate-limit response, if present."""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class LLMClient:
+    """Process-wide async chat-completions client with pooling, bounded concurrency and retries."""
+
+    def __init__(
+        self,
+        api_key: Optional[Text] = GROQ_API_KEY,
+        base_url: Optional[Text] = GROQ_BASE_URL,
+        model: Text = LLM_MODEL,
+        timeout: float = LLM_TIMEOUT,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_keepalive: int = LLM_MAX_KEEPALIVE,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        rate_limit_rpm: float = LLM_RATE_LIMIT_RPM,
+        rate_limit_burst: int = LLM_RATE_LIMIT_BURST,
+        rate_limit_max_wait: float = LLM_RATE_LIMIT_MAX_WAIT,
+        breaker_failures: int = LLM_BREAKER_FAILURES,
+        breaker_slo: float = LLM_BREAKER_SLO,
+        breaker_cooldown: float = LLM_BREAKER_COOLDOWN,
+    ) -> None:
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional["groq.AsyncGroq"] = None
+        self.rate_limiter: Optional[TokenBucket] = None
+        if rate_limit_rpm > 0:
+            self.rate_limiter = TokenBucket(rate_limit_rpm / 60, rate_limit_burst, rate_limit_max_wait)
+        self.breaker = CircuitBreaker(breaker_failures, breaker_slo, breaker_cooldown)
+
+    def _get_client(self) -> "groq.AsyncGroq":
+        # Created lazily so the underlying connection pool lives on the server's event loop
+        if self._client is None:
+            if not self.api_key:
+                raise RuntimeError("GROQ_API_KEY is not set; export your Groq API key before starting the action server")
+            import groq
+            import httpx
+
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=30.0,
+                ),
+                timeout=self.timeout,
+            )
+            self._client = groq.AsyncGroq(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=http_client,
+                max_retries=0,  # retries are handled here with jittered backoff
+                timeout=self.timeout,
+            )
+        return self._client
+
+    @staticmethod
+    def _record_usage(usage: Any) -> None:
+        if usage is not None:
+            LLM_TOKENS.inc(usage.prompt_tokens or 0, kind="prompt")
+            LLM_TOKENS.inc(usage.completion_tokens or 0, kind="completion")
+
+    @property
+    def available(self) -> bool:
+        """False while the circuit breaker is open, i.e. callers should use their fallback right away."""
+        return not self.breaker.rejecting()
+
+    async def _admit(self, mode: Text) -> None:
+        """Wait for the breaker and the rate limiter to let one attempt through."""
+        if not self.breaker.allow():
+            LLM_REQUESTS.inc(mode=mode, outcome="circuit_open")
+            raise CircuitOpenError("LLM circuit breaker is open")
+        if self.rate_limiter is not None:
+            try:
+                await self.rate_limiter.acquire()
+            except RateLimitedError:
+                # The attempt never reached the backend: a claimed half-open probe goes back
+                self.breaker.release()
+                LLM_REQUESTS.inc(mode=mode, outcome="rate_limited")
+                raise
+
+    def _attempt_succeeded(self, latency: float) -> None:
+        self.breaker.record_success(latency)
+        if self.rate_limiter is not None:
+            self.rate_limiter.recover()
+
+    def _attempt_failed(self, error: Exception) -> None:
+        """A retryable error: 429s slow the rate limiter down, everything else counts against the breaker."""
+        import groq
+
+        if isinstance(error, groq.RateLimitError):
+            self.breaker.release()
+            if self.rate_limiter is not None:
+                self.rate_limiter.throttle(_retry_after(error))
+        else:
+            self.breaker.record_failure()
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for the given attempt number."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def complete(
+        self,
+        prompt: Text,
+        max_tokens: int,
+        temperature: float = 0.3,
+        timeout: Optional[float] = None,
+    ) -> Text:
+        """Send a single-message chat completion and return the raw response text."""
+        messages: List[Dict[Text, Any]] = [{"role": "user", "content": prompt}]
+        client = self._get_client()
+        attempt = 0
+        start = time.perf_counter()
+        while True:
+            await self._admit("complete")
+            try:
+                async with self._semaphore:
+                    # Measured from here so that local queueing does not count against the breaker's SLO
+                    attempt_start = time.perf_counter()
+                    response = await client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        timeout=timeout or self.timeout,
+                    )
+                self._attempt_succeeded(time.perf_counter() - attempt_start)
+                LLM_REQUESTS.inc(mode="complete", outcome="ok")
+                LLM_LATENCY.observe(time.perf_counter() - start, mode="complete")
+                self._record_usage(response.usage)
+                return response.choices[0].message.content
+            except retryable_errors() as e:
+                self._attempt_failed(e)
+                if attempt >= self.max_retries:
+                    LLM_REQUESTS.inc(mode="complete", outcome="error")
+                    raise
+                LLM_REQUESTS.inc(mode="complete", outcome="retry")
+                delay = self._backoff(attempt)
+                logger.warning("LLM call failed (%s), retrying in %.2fs", e.__class__.__name__, delay)
+                attempt += 1
+                await asyncio.sleep(delay)
+            except Exception:
+                # Non-retryable errors (e.g. 4xx) say nothing about the backend's health
+                self.breaker.release()
+                LLM_REQUESTS.inc(mode="complete", outcome="error")
+                raise
+
+    async def stream(
+        self,
+        prompt: Text,
+        max_tokens: int,
+        temperature: float = 0.3,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Text]:
+        """Stream a chat completion, yielding text deltas as they arrive.
+
+        Failures are retried only until the first delta has been yielded.
+        """
+        messages: List[Dict[Text, Any]] = [{"role": "user", "content": prompt}]
+        client = self._get_client()
+        attempt = 0
+        started = False
+        start = time.perf_counter()
+        while True:
+            await self._admit("stream")
+            try:
+                async with self._semaphore:
+                    attempt_start = time.perf_counter()
+                    stream = await client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        timeout=timeout or self.timeout,
+                        stream=True,
+                    )
+                    try:
+                        async for chunk in stream:
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                if not started:
+                                    # Time to first token is what the breaker's SLO applies to
+                                    self._attempt_succeeded(time.perf_counter() - attempt_start)
+                                    started = True
+                                yield delta
+                            # Groq reports usage in the final chunk
+                            self._record_usage(getattr(getattr(chunk, "x_groq", None), "usage", None))
+                    finally:
+                        await stream.close()
+                if not started:
+                    self._attempt_succeeded(time.perf_counter() - attempt_start)
+                LLM_REQUESTS.inc(mode="stream", outcome="ok")
+                LLM_LATENCY.observe(time.perf_counter() - start, mode="stream")
+                return
+            except retryable_errors() as e:
+                self._attempt_failed(e)
+                if started or attempt >= self.max_retries:
+                    LLM_REQUESTS.inc(mode="stream", outcome="error")
+                    raise
+                LLM_REQUESTS.inc(mode="stream", outcome="retry")
+                delay = self._backoff(attempt)
+                logger.warning("LLM stream failed (%s), retrying in %.2fs", e.__class__.__name__, delay)
+                attempt += 1
+                await asyncio.sleep(delay)
+            except Exception:
+                # Non-retryable errors (e.g. 4xx) say nothing about the backend's health
+                self.breaker.release()
+                LLM_REQUESTS.inc(mode="stream", outcome="error")
+                raise
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+_llm_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """Return the shared LLM client, creating it on first use."""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient()
+    return _llm_client
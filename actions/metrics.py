@@ -0,0 +1,314 @@
+"""Process-wide counters and latency histograms, exported in the Prometheus text format.
+
+Scrape them from http://127.0.0.1:5056/metrics (METRICS_PORT, 0 disables). The endpoint has no
+authentication, so it listens on loopback only unless METRICS_HOST says otherwise.
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Text, Tuple
+import bisect
+import functools
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "5056"))
+
+# Seconds; covers everything from in-memory lookups to slow LLM completions
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[Text, ...]
+
+
+def _escape(value: Text) -> Text:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[Text], values: Sequence[Any]) -> Text:
+    if not names:
+        return ""
+    pairs = (f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> Text:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base class for a metric family with a fixed set of label names."""
+
+    type = "untyped"
+
+    def __init__(self, name: Text, documentation: Text, labelnames: Sequence[Text] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[Text, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[Text, Text, float]]:
+        """(sample name, formatted labels, value) triples."""
+        raise NotImplementedError
+
+    def render(self) -> Text:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: Text, documentation: Text, labelnames: Sequence[Text] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def snapshot(self) -> Dict[LabelValues, float]:
+        """Current values keyed by label values, in `labelnames` order."""
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self) -> List[Tuple[Text, Text, float]]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in items]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: Text,
+        documentation: Text,
+        labelnames: Sequence[Text] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, last is +Inf), sum, count]
+        self._values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the wall-clock duration of the enclosed block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: Any) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self) -> List[Tuple[Text, Text, float]]:
+        with self._lock:
+            items = sorted((key, [list(state[0]), state[1], state[2]]) for key, state in self._values.items())
+        samples = []
+        names = self.labelnames + ("le",)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = "+Inf" if math.isinf(bound) else _format_value(bound)
+                samples.append((f"{self.name}_bucket", _format_labels(names, key + (le,)), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, key), total))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, key), count))
+        return samples
+
+
+class Registry:
+    """Holds metric families plus stats() callbacks that are turned into gauges on every scrape."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[Text, Metric] = {}
+        self._stats: List[Tuple[Text, Callable[[], Dict[Text, Any]], Dict[Text, Text]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def register_stats(self, prefix: Text, stats: Callable[[], Dict[Text, Any]], **labels: Text) -> None:
+        """Export the numeric fields of `stats()` as `<prefix>_<field>` gauges (nested dicts are flattened)."""
+        with self._lock:
+            self._stats.append((prefix, stats, labels))
+
+    def _collect_stats(self) -> List[Metric]:
+        gauges: Dict[Text, Gauge] = {}
+        for prefix, stats, labels in self._stats:
+            try:
+                values = stats()
+            except Exception as e:
+                logger.error("Collecting %s stats failed: %s", prefix, e)
+                continue
+            for field, value in _flatten(values):
+                name = f"{prefix}_{field}"
+                gauge = gauges.get(name)
+                if gauge is None:
+                    gauge = gauges[name] = Gauge(name, f"{prefix} stats field '{field}'", tuple(labels))
+                gauge.set(value, **labels)
+        return list(gauges.values())
+
+    def render(self) -> Text:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        families = [metric.render() for metric in metrics + self._collect_stats()]
+        return "\n".join(families) + "\n"
+
+
+def _flatten(values: Dict[Text, Any], prefix: Text = "") -> Iterator[Tuple[Text, float]]:
+    for field, value in values.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{field}_")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{field}", value
+
+
+REGISTRY = Registry()
+
+ACTION_LATENCY = REGISTRY.register(Histogram(
+    "action_duration_seconds", "Wall-clock time of a custom action run", ["action"]
+))
+ACTION_ERRORS = REGISTRY.register(Counter(
+    "action_errors_total", "Exceptions raised out of a custom action run", ["action"]
+))
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "action_stage_duration_seconds", "Wall-clock time of one stage inside a custom action", ["action", "stage"]
+))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "cache_lookups_total", "Cache lookups made by the actions by outcome (hit or miss)", ["cache", "result"]
+))
+INTENT_SOURCES = REGISTRY.register(Counter(
+    "intent_classifications_total", "Intent classifications by the component that decided them", ["source"]
+))
+FALLBACKS = REGISTRY.register(Counter(
+    "answer_fallbacks_total", "Replies replaced by a knowledge-base or canned fallback", ["action", "reason"]
+))
+LLM_REQUESTS = REGISTRY.register(Counter(
+    "llm_requests_total", "LLM API attempts by mode (complete or stream) and outcome", ["mode", "outcome"]
+))
+LLM_LATENCY = REGISTRY.register(Histogram(
+    "llm_request_duration_seconds", "Wall-clock time of successful LLM calls including retries", ["mode"]
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "llm_tokens_total", "Tokens reported by the LLM API", ["kind"]
+))
+PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "llm_prompt_tokens", "Estimated tokens of each prompt sent to the LLM by template", ["prompt"],
+    buckets=(64, 128, 256, 512, 768, 1024, 1536, 2048, 4096),
+))
+PROMPT_TRUNCATIONS = REGISTRY.register(Counter(
+    "llm_prompt_truncations_total", "Prompt sections shortened to fit the template's token budget", ["prompt", "section"]
+))
+
+
+def timed_action(run: Callable) -> Callable:
+    """Decorator for Action.run recording its duration and escaped exceptions under the action's name."""
+
+    @functools.wraps(run)
+    async def wrapper(self, dispatcher, tracker, domain):
+        action = self.name()
+        start = time.perf_counter()
+        try:
+            return await run(self, dispatcher, tracker, domain)
+        except Exception:
+            ACTION_ERRORS.inc(action=action)
+            raise
+        finally:
+            ACTION_LATENCY.observe(time.perf_counter() - start, action=action)
+
+    return wrapper
+
+
+def timed_stage(action: Text, stage: Text):
+    """Context manager timing one stage of an action."""
+    return STAGE_LATENCY.time(action=action, stage=stage)
+
+
+def record_cache_lookup(cache: Text, value: Optional[Any]) -> Optional[Any]:
+    """Count a cache lookup as a hit or miss and pass the looked-up value through."""
+    CACHE_LOOKUPS.inc(cache=cache, result="miss" if value is None else "hit")
+    return value
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        payload = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+_metrics_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: Text = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics from a daemon thread; a no-op if disabled or already running."""
+    global _metrics_server
+    if _metrics_server is not None or not port:
+        return _metrics_server
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    _metrics_server = server
+    logger.info("Serving metrics on http://%s:%s/metrics", host, server.server_address[1])
+    return server
@@ -0,0 +1,51 @@
+from typing import Dict, List, Optional, Text
+import os
+import re
+
+import yaml
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NLU_PATH = os.path.join(PROJECT_ROOT, "data", "nlu.yml")
+
+# Entity annotations like "[Godavari Ganga](variety)" or "[nut]{\"entity\": \"seed\"}"
+ENTITY_ANNOTATION_RE = re.compile(r'\[([^\]]+)\](?:\([^)]*\)|\{[^}]*\})')
+
+
+def strip_entity_annotations(example: Text) -> Text:
+    return ENTITY_ANNOTATION_RE.sub(r'\1', example)
+
+
+def load_annotated_nlu_examples(path: Optional[Text] = None) -> Dict[Text, List[Text]]:
+    """Return {intent: [examples]} from a Rasa NLU training file, keeping entity annotations."""
+    with open(path or NLU_PATH, encoding="utf-8") as f:
+        nlu = yaml.safe_load(f).get("nlu", [])
+    examples: Dict[Text, List[Text]] = {}
+    for block in nlu:
+        intent = block.get("intent")
+        if not intent:
+            continue
+        for line in block.get("examples", "").splitlines():
+            line = line.strip()
+            if line.startswith("- "):
+                examples.setdefault(intent, []).append(line[2:].strip())
+    return examples
+
+
+def load_nlu_examples(path: Optional[Text] = None) -> Dict[Text, List[Text]]:
+    """Return {intent: [plain-text examples]} from a Rasa NLU training file."""
+    return {
+        intent: [strip_entity_annotations(example) for example in examples]
+        for intent, examples in load_annotated_nlu_examples(path).items()
+    }
+
+
+def write_nlu_examples(path: Text, examples: Dict[Text, List[Text]]) -> None:
+    """Write {intent: [examples]} as a Rasa NLU training file."""
+    lines = ['version: "3.1"', "", "nlu:"]
+    for intent, intent_examples in examples.items():
+        if intent_examples:
+            lines += [f"- intent: {intent}", "  examples: |"]
+            lines += [f"    - {example}" for example in intent_examples]
+            lines.append("")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
@@ -0,0 +1,122 @@
+from typing import Dict, List, Optional, Text, Tuple
+import re
+
+# Extended spelling and synonym variation dictionary for normalization
+SPELLING_VARIATIONS = {
+    "fertiliser": "fertilizer",
+    "fertilisers": "fertilizer",
+    "manoeuvre": "maneuver",
+    "manoeuvres": "maneuver",
+    "colour": "color",
+    "colours": "color",
+    "organisation": "organization",
+    "organisations": "organization",
+    "manure": "manure",
+    "manures": "manure",
+    "compost": "manure",
+    "organic fertilizer": "manure",
+    "green manure": "manure",
+    "vermicompost": "manure",
+    "soil": "soil",
+    "soils": "soil",
+    "land": "soil",
+    "ground": "soil",
+    "earth": "soil",
+    "variety": "variety",
+    "varieties": "variety",
+    "hybrid": "variety",
+    "breed": "variety",
+    "cultivar": "variety",
+    "strain": "variety",
+    "type": "variety",
+    "kind": "variety",
+    "intercrop": "intercrop",
+    "intercrops": "intercrop",
+    "research center": "research_station",
+    "research institute": "research_station",
+    "station": "research_station",
+    "facility": "research_station",
+    "nutrient": "fertilizer",
+    "chemical": "fertilizer",
+    "feed": "fertilizer",
+    "weather": "climate",
+    "environment": "climate",
+    "conditions": "climate",
+    "nut": "seed",
+    "seedling": "seed",
+    "propagule": "seed"
+}
+
+PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+
+class SpellingNormalizer:
+    """Maps spelling variations and synonyms to a standard form in one pass over the words.
+
+    Single-word variations (with an optional plural 's') are resolved with a dict lookup.
+    Multi-word variations such as "organic fertilizer" are matched longest-first with a token trie.
+    """
+
+    def __init__(self, variations: Dict[Text, Text]) -> None:
+        self.words: Dict[Text, Text] = {}
+        self.phrases: Dict[Text, dict] = {}  # token trie; the None key holds the standard form
+        for variation, standard in variations.items():
+            tokens = variation.lower().split()
+            if len(tokens) == 1:
+                # First matching entry wins, as in the original ordered scan
+                self.words.setdefault(tokens[0], standard)
+                self.words.setdefault(tokens[0] + "s", standard)
+            else:
+                self._add_phrase(tokens, standard)
+                self._add_phrase(tokens[:-1] + [tokens[-1] + "s"], standard)
+
+    def _add_phrase(self, tokens: List[Text], standard: Text) -> None:
+        node = self.phrases
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(None, standard)
+
+    def _match_phrase(self, tokens: List[Text], start: int) -> Optional[Tuple[Text, int]]:
+        """Return (standard, end) for the longest phrase starting at `start`, if any."""
+        node = self.phrases.get(tokens[start])
+        best = None
+        end = start + 1
+        while node is not None:
+            if None in node:
+                best = (node[None], end)
+            if end >= len(tokens):
+                break
+            node = node.get(tokens[end])
+            end += 1
+        return best
+
+    def normalize(self, text: Text) -> Text:
+        tokens = []
+        for word in text.split():
+            clean_word = word.lower()
+            if not clean_word.isalnum():
+                # Remove punctuation for matching
+                clean_word = PUNCTUATION_RE.sub('', clean_word)
+            tokens.append(clean_word)
+
+        normalized_words = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token in self.phrases:
+                match = self._match_phrase(tokens, i)
+                if match is not None:
+                    normalized_words.append(match[0])
+                    i = match[1]
+                    continue
+            normalized_words.append(self.words.get(token, token))
+            i += 1
+        return " ".join(normalized_words)
+
+
+_normalizer = SpellingNormalizer(SPELLING_VARIATIONS)
+
+
+def normalize_spelling(text: str) -> str:
+    """Normalize spelling variations and synonyms to a standard form."""
+    return _normalizer.normalize(text)
@@ -0,0 +1,174 @@
+"""Pre-generate intents and answers for the topic questions in data/nlu.yml.
+
+Each distinct normalized question goes through ActionClassifyIntent and ActionAnswerQuery, with
+at most --concurrency questions in flight. Every finished question is appended to a JSONL
+checkpoint, so an interrupted run resumes where it stopped. Questions whose answer did not come
+from the LLM (knowledge-base fallbacks during errors or rate limiting, rejected answers) are
+retried on the next run, and so are answers generated from an older knowledge base. LLM answers
+are written to the memory-mapped store the action server checks before calling the LLM:
+
+    python -m actions.precompute --concurrency 8
+    python -m actions.precompute --build-only   # rebuild the store from the checkpoint
+"""
+from typing import Any, Dict, List, Optional, Text
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+
+from actions.keywords import INTENTS
+from actions.nlu_data import PROJECT_ROOT, load_nlu_examples
+from actions.normalizer import normalize_spelling
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PATH = os.path.join(PROJECT_ROOT, ".cache", "precompute_checkpoint.jsonl")
+
+
+def load_checkpoint(path: Text) -> Dict[Text, Dict[Text, Any]]:
+    """Latest record per normalized question; a torn last line from an interrupted run is ignored."""
+    records: Dict[Text, Dict[Text, Any]] = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record["key"]] = record
+    return records
+
+
+def is_done(record: Optional[Dict[Text, Any]], kb_fingerprint: Text) -> bool:
+    return record is not None and record["status"] == "ok" and record.get("kb_fingerprint") == kb_fingerprint
+
+
+def build_store(records: Dict[Text, Dict[Text, Any]], out: Text, kb_fingerprint: Text) -> int:
+    from actions.answer_store import write_answer_store
+
+    entries = [
+        (key, record["intent"], record["answer"])
+        for key, record in records.items()
+        if is_done(record, kb_fingerprint)
+    ]
+    write_answer_store(out, entries, kb_fingerprint)
+    return len(entries)
+
+
+async def process(question: Text, key: Text, kb_fingerprint: Text) -> Dict[Text, Any]:
+    """Classify and answer one question the way the action server would."""
+    from rasa_sdk import Tracker
+    from rasa_sdk.executor import CollectingDispatcher
+
+    from actions.actions import ActionAnswerQuery, ActionClassifyIntent, answer_source
+
+    record: Dict[Text, Any] = {"key": key, "question": question, "kb_fingerprint": kb_fingerprint}
+    events = [{"event": "user", "text": question}]
+    tracker = Tracker("precompute", {}, {"text": question}, events, False, None, {}, "action_listen")
+    classify_events = await ActionClassifyIntent().run(CollectingDispatcher(), tracker, {})
+    intent = next((e["value"] for e in classify_events if e.get("event") == "slot"), None)
+    if intent is None:
+        return dict(record, status="ambiguous")
+
+    dispatcher = CollectingDispatcher()
+    slots = {"classified_intent": intent}
+    tracker = Tracker("precompute", slots, {"text": question}, events, False, None, {}, "action_listen")
+    answer_source.set(None)
+    await ActionAnswerQuery().run(dispatcher, tracker, {})
+    answer = " ".join(message["text"] for message in dispatcher.messages if message.get("text"))
+    source = answer_source.get()
+    if source == "direct":
+        # Answered from the knowledge base without the LLM; the server does the same at runtime
+        return dict(record, intent=intent, status="direct")
+    # Anything else not generated by the LLM (knowledge-base fallbacks while it is failing or
+    # rate limited, rejected answers) is retried on the next run instead of being stored
+    if source != "llm":
+        return dict(record, intent=intent, status="fallback")
+    return dict(record, intent=intent, answer=answer, status="ok")
+
+
+async def run(questions: Dict[Text, Text], checkpoint: Text, concurrency: int, kb_fingerprint: Text) -> Dict[Text, int]:
+    from actions.llm_client import get_llm_client
+
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses: Dict[Text, int] = {}
+    done = 0
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(checkpoint) or ".", exist_ok=True)
+
+    with open(checkpoint, "a", encoding="utf-8") as f:
+
+        async def worker(key: Text, question: Text) -> None:
+            nonlocal done
+            async with semaphore:
+                # Pause rather than fill the checkpoint with fallbacks while the LLM is down
+                while not get_llm_client().available:
+                    await asyncio.sleep(1.0)
+                try:
+                    record = await process(question, key, kb_fingerprint)
+                except Exception as e:
+                    logger.error("Failed to precompute %r: %s", question, e)
+                    record = {"key": key, "question": question, "status": "error", "error": str(e)}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+            done += 1
+            if done % 25 == 0 or done == len(questions):
+                print(f"{done}/{len(questions)} questions ({done / (time.perf_counter() - start):.1f}/s): {statuses}")
+
+        await asyncio.gather(*(worker(key, question) for key, question in questions.items()))
+        os.fsync(f.fileno())
+    return statuses
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nlu", default=None, help="Path to the NLU training file (default: data/nlu.yml)")
+    parser.add_argument("--out", default=None, help="Where to write the answer store (default: PRECOMPUTED_ANSWERS_PATH)")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="JSONL checkpoint used to resume")
+    parser.add_argument("--concurrency", type=int, default=8, help="Questions in flight at a time")
+    parser.add_argument("--limit", type=int, default=None, help="Process at most this many pending questions")
+    parser.add_argument("--build-only", action="store_true", help="Only rebuild the store from the checkpoint")
+    args = parser.parse_args()
+
+    # Answers must come from the LLM pipeline itself: not streamed, not reused from a paraphrase,
+    # a previous store or a shared cache (which may hold fallbacks), and without the server's
+    # background threads. The actions modules read these when first imported, so import them only
+    # after this point
+    os.environ["ANSWER_STREAMING"] = "false"
+    os.environ["CACHE_BACKEND"] = "memory"
+    os.environ["SEMANTIC_CACHE"] = "false"
+    os.environ["PRECOMPUTED_ANSWERS"] = "false"
+    os.environ.setdefault("METRICS_PORT", "0")
+    os.environ.setdefault("WARM_UP_ON_START", "false")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from actions.answer_store import PRECOMPUTED_ANSWERS_PATH
+    from actions.knowledge_base import get_knowledge_base
+
+    out = args.out or PRECOMPUTED_ANSWERS_PATH
+    kb_fingerprint = get_knowledge_base().fingerprint
+    records = load_checkpoint(args.checkpoint)
+    if not args.build_only:
+        questions: Dict[Text, Text] = {}
+        examples_by_intent = load_nlu_examples(args.nlu)
+        for intent in INTENTS:
+            for example in examples_by_intent.get(intent, []):
+                key = normalize_spelling(example.lower())
+                if key and key not in questions and not is_done(records.get(key), kb_fingerprint):
+                    questions[key] = example
+        pending: List[Text] = list(questions)[:args.limit]
+        print(f"{len(pending)} questions to precompute ({len(records)} in the checkpoint)")
+        statuses = asyncio.run(run({key: questions[key] for key in pending}, args.checkpoint, args.concurrency, kb_fingerprint))
+        print(f"finished: {statuses}")
+        records = load_checkpoint(args.checkpoint)
+
+    count = build_store(records, out, kb_fingerprint)
+    print(f"wrote {count} answers, {os.path.getsize(out) / 1024:.1f} KiB -> {out}")
+
+
+if __name__ == "__main__":
+    main()
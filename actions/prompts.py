@@ -0,0 +1,265 @@
+"""Answer examples and the prompt templates sent to the LLM.
+
+Each template's static prefix (instructions, rules, fixed examples) is rendered, stripped of
+indentation and token-counted once at import. Per call only the dynamic sections (history,
+data, query) are appended after it, so every prompt of a template starts with the same text and
+backends that cache prompt prefixes can reuse it. The dynamic sections are kept within the
+template's token budget: the user message and each history entry are capped at
+PROMPT_MAX_QUERY_TOKENS, then the oldest history entries are dropped, then the shrinkable
+sections (retrieved data and examples) are cut.
+
+Token counts use estimate_tokens(), an approximation of the model's tokenizer.
+"""
+from typing import Dict, List, NamedTuple, Sequence, Text, Tuple
+import logging
+import os
+
+from actions.keywords import INTENTS
+from actions.metrics import PROMPT_TOKENS, PROMPT_TRUNCATIONS
+
+logger = logging.getLogger(__name__)
+
+# Token budget of a whole prompt, and cap on the user message and each history entry
+PROMPT_MAX_TOKENS = int(os.environ.get("PROMPT_MAX_TOKENS", "1500"))
+PROMPT_MAX_QUERY_TOKENS = int(os.environ.get("PROMPT_MAX_QUERY_TOKENS", "100"))
+
+
+class AnswerExample(NamedTuple):
+    query: Text
+    intent: Text
+    answer: Text
+
+
+# Worked examples for answer generation; the most relevant few are added to each prompt
+ANSWER_EXAMPLES: List[AnswerExample] = [
+    AnswerExample("Why are my coconut leaves yellow?", "nutrient_management",
+                  "Yellowing coconut leaves are likely due to nitrogen deficiency, causing stunted growth in young plants."),
+    AnswerExample("nitrogen deficiency symptoms in coconut?", "nutrient_management",
+                  "Nitrogen deficiency in coconut trees causes yellow leaves and stunted growth, especially in young plants."),
+    AnswerExample("What soil for coconut nursery?", "cultivation_methods",
+                  "For a coconut nursery, use light upland soils with drainage facilities and plant nuts 30 cm between rows."),
+    AnswerExample("Name of coconut varieties", "coconut_varieties",
+                  "Popular coconut varieties include East Coast Tall, Godavari Ganga, Double Century, Gauthami Ganga, Vasishta Ganga, Vainateya Ganga, and Abhaya Ganga."),
+    AnswerExample("Suggest fertiliser management schedule for 2 years old coconut plants?", "fertilizers",
+                  "For 2-year-old coconut plants, apply 0.5kg urea, 1kg super phosphate, 1kg potash, and 20kg manure per tree annually, in two splits (June-July, September-October) in a trench 3 feet from the trunk, then cover with soil and irrigate."),
+    AnswerExample("Which coconut hybrid is released by Ambajipeta?", "coconut_varieties",
+                  "The coconut hybrid Godavari Ganga was released by Ambajipeta in 1991."),
+    AnswerExample("Coconut breed from research center Ambajipeta?", "coconut_varieties",
+                  "The coconut variety Godavari Ganga, a hybrid, was released by Ambajipeta in 1991."),
+    AnswerExample("Compost for coconut trees?", "organic_manures",
+                  "Use 16 tonnes/hectare of coconut waste, like leaves and husks, to prepare compost for coconut trees, which stabilizes yields and improves soil health."),
+    AnswerExample("Weather for coconut farming?", "climate_soils",
+                  "Coconut farming thrives in coastal areas with 1000-2000 mm rainfall and high humidity, but growth reduces below 15°C."),
+    AnswerExample("How to select coconut nuts?", "cultivation_methods",
+                  "Select coconut nuts from 15-40-year-old trees yielding 100 nuts/year with 150g copra, collected in April-May and dried for 20 days."),
+]
+
+
+def format_answer_examples(examples: List[AnswerExample]) -> Text:
+    """Render examples in the layout used by the answer prompt."""
+    return "\n".join(
+        f"- Query: \"{example.query}\" ({example.intent})\n"
+        f"  Answer: \"{example.answer}\""
+        for example in examples
+    )
+
+
+def estimate_tokens(text: Text) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def minify(text: Text) -> Text:
+    """Strip indentation and trailing spaces and collapse runs of blank lines."""
+    lines = [line.strip() for line in text.strip().splitlines()]
+    return "\n".join(line for i, line in enumerate(lines) if line or (i and lines[i - 1]))
+
+
+def truncate_tokens(text: Text, max_tokens: int) -> Text:
+    """Cut text to about max_tokens at a word boundary."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max(0, max_tokens * 4 - 3)]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut + "..."
+
+
+class RenderedPrompt(NamedTuple):
+    text: Text
+    tokens: int
+    prefix_tokens: int
+    truncated: Tuple[Text, ...]  # sections shortened to fit the budget
+
+
+class PromptTemplate:
+    """A static prefix rendered once plus labelled dynamic sections appended per call.
+
+    `sections` are (name, label) pairs in the order they are appended; a section rendered with
+    an empty value is left out. "history" takes a list of earlier user messages, the others text.
+    """
+
+    def __init__(
+        self,
+        name: Text,
+        prefix: Text,
+        sections: Sequence[Tuple[Text, Text]],
+        shrinkable: Sequence[Text] = (),
+        max_tokens: int = PROMPT_MAX_TOKENS,
+        max_query_tokens: int = PROMPT_MAX_QUERY_TOKENS,
+    ) -> None:
+        self.name = name
+        self.prefix = minify(prefix)
+        self.prefix_tokens = estimate_tokens(self.prefix)
+        self.sections = list(sections)
+        self.shrinkable = list(shrinkable)
+        self.max_tokens = max_tokens
+        self.max_query_tokens = max_query_tokens
+
+    def _suffix(self, values: Dict[Text, Text], history: List[Text]) -> Text:
+        lines = []
+        for name, label in self.sections:
+            value = str(history) if name == "history" else values.get(name)
+            if value:
+                # Multi-line values (numbered queries, examples) start on their own line
+                lines.append(f"{label}:\n{value}" if "\n" in value else f"{label}: {value}")
+        return "\n".join(lines)
+
+    def render(self, history: Sequence[Text] = (), **values: Text) -> RenderedPrompt:
+        truncated = []
+        query = values.get("query")
+        if query and estimate_tokens(query) > self.max_query_tokens:
+            values["query"] = truncate_tokens(query, self.max_query_tokens)
+            truncated.append("query")
+        history = [text for text in history if text]
+        capped = [truncate_tokens(text, self.max_query_tokens) for text in history]
+        if capped != history:
+            truncated.append("history")
+        history = capped
+        # The separating blank line counts as one token
+        budget = self.max_tokens - self.prefix_tokens - 1
+        suffix = self._suffix(values, history)
+        if estimate_tokens(suffix) > budget and history:
+            if "history" not in truncated:
+                truncated.append("history")
+            while history and estimate_tokens(suffix) > budget:
+                history.pop(0)
+                suffix = self._suffix(values, history)
+        for name in self.shrinkable:
+            overflow = estimate_tokens(suffix) - budget
+            if overflow <= 0:
+                break
+            value = values.get(name)
+            if value:
+                values[name] = truncate_tokens(value, max(0, estimate_tokens(value) - overflow - 1))
+                truncated.append(name)
+                suffix = self._suffix(values, history)
+        text = f"{self.prefix}\n\n{suffix}"
+        tokens = self.prefix_tokens + 1 + estimate_tokens(suffix)
+        PROMPT_TOKENS.observe(tokens, prompt=self.name)
+        for section in truncated:
+            PROMPT_TRUNCATIONS.inc(prompt=self.name, section=section)
+        if truncated:
+            logger.warning("Prompt %s truncated (%s) to %s tokens", self.name, ", ".join(truncated), tokens)
+        logger.debug("Prompt %s: %s tokens, %s in the static prefix", self.name, tokens, self.prefix_tokens)
+        return RenderedPrompt(text, tokens, self.prefix_tokens, tuple(truncated))
+
+    def stats(self) -> Dict[Text, int]:
+        return {"prefix_tokens": self.prefix_tokens, "max_tokens": self.max_tokens}
+
+
+SUB_QUERY_RULES = """
+Rules:
+- Yellowing leaves, nutrient deficiencies (e.g., nitrogen, phosphorus) → 'nutrient_management'.
+- Nursery setup, seed/nut selection, planting → 'cultivation_methods'.
+- Fertilizers, urea, potash, nutrients → 'fertilizers'.
+- Coconut varieties, hybrids, breeds → 'coconut_varieties'.
+- Climate, weather, soil types → 'climate_soils'.
+- Area, productivity, research (e.g., Ambajipeta) → 'coconut_general'.
+- Intercrops, plowing, weed control → 'inter_cultivation'.
+- Organic manures, compost → 'organic_manures'.
+If ambiguous, return 'ambiguous' with a clarifying question.
+Treat synonyms (e.g., 'hybrid'/'variety', 'compost'/'manure') as equivalent.
+"""
+
+CLASSIFY_PROMPT = PromptTemplate(
+    "classify",
+    f"""
+    You are an assistant for coconut cultivation queries. Classify the user's query into one of the following intents:
+    {', '.join(INTENTS)}.
+    Use the following rules:
+    - Queries about yellowing leaves, delayed spathes, or nutrient deficiencies (e.g., nitrogen, phosphorus, potash, minerals) → 'nutrient_management'.
+    - Queries about nursery setup, soil type, seed/nut selection, planting, or germination → 'cultivation_methods'.
+    - Queries about fertilizers, urea, potash, neem cake, nutrients, or chemicals → 'fertilizers'.
+    - Queries about coconut varieties (e.g., Godavari Ganga, East Coast Tall), hybrids, breeds, cultivars, strains, types, or kinds → 'coconut_varieties'.
+    - Queries about climate, weather, rainfall, humidity, soil types, or land conditions → 'climate_soils'.
+    - Queries about area, productivity, districts, or research (e.g., Ambajipeta research station, research center, or facility) → 'coconut_general'.
+    - Queries about intercrops, companion crops, plowing, or weed control → 'inter_cultivation'.
+    - Queries about organic manures, compost, vermicompost, or green manure → 'organic_manures'.
+    If the query is ambiguous or cannot be confidently classified, return 'ambiguous' and suggest a clarifying question based on likely intents.
+    Consider the conversation history to classify follow-up queries accurately.
+    Treat spelling variations (e.g., 'fertiliser'/'fertilizer') and synonyms (e.g., 'hybrid'/'variety', 'compost'/'manure', 'weather'/'climate', 'nut'/'seed') as equivalent for intent classification.
+    Provide the response in JSON format with 'intent' and 'clarifying_question' (if applicable).
+
+    Examples:
+    - "Suggest fertilizer schedule for coconut plants" → {{"intent": "fertilizers"}}
+    - "Suggest nutrient management for 2 years old coconut plants?" → {{"intent": "fertilizers"}}
+    - "Why are my coconut leaves yellow?" → {{"intent": "nutrient_management"}}
+    - "What soil for coconut nursery?" → {{"intent": "cultivation_methods"}}
+    - "How to grow coconuts?" → {{"intent": "ambiguous", "clarifying_question": "Could you specify if you're interested in cultivation methods, varieties, or fertilizers?"}}
+    - History: ["Nutrient deficiency symptoms in coconuts"], Query: "nitrogen deficiency symptoms in coconut?" → {{"intent": "nutrient_management"}}
+    - Query: "coconut varieties" → {{"intent": "coconut_varieties"}}
+    - Query: "Which coconut hybrid is released by Ambajipeta?" → {{"intent": "coconut_varieties"}}
+    - Query: "Coconut breed from research center Ambajipeta?" → {{"intent": "coconut_varieties"}}
+    - Query: "Compost for coconut trees?" → {{"intent": "organic_manures"}}
+    - Query: "Weather for coconut farming?" → {{"intent": "climate_soils"}}
+    - Query: "How to select coconut nuts?" → {{"intent": "cultivation_methods"}}
+    """,
+    [("history", "Conversation history"), ("query", "User query")],
+)
+
+ANSWER_PROMPT = PromptTemplate(
+    "answer",
+    """
+    You are an expert in coconut cultivation. Answer the user's query using ONLY the provided data, ensuring accuracy and relevance. Use natural, conversational language, keeping the answer concise and targeted to the specific question (1-2 sentences if possible, up to 5 if needed). If the query is a follow-up, use the conversation history for context to provide a precise answer. If the query is too specific or unmapped, provide the most relevant subset of the data or suggest a related topic from the data. Treat synonyms like 'hybrid'/'variety', 'compost'/'manure', 'weather'/'climate', 'nut'/'seed', 'nutrient'/'fertilizer', 'land'/'soil', and 'research center'/'research_station' as equivalent.
+    """,
+    [("examples", "Examples"), ("intent", "Intent"), ("data", "Data"), ("history", "Conversation history"), ("query", "User query")],
+    shrinkable=["examples", "data"],
+)
+
+SUB_QUERY_CLASSIFY_PROMPT = PromptTemplate(
+    "sub_query_classify",
+    f"""
+    Classify the user's query into one of the following intents: {', '.join(INTENTS)}.
+    {SUB_QUERY_RULES}
+    Response in JSON: {{'intent': str, 'clarifying_question': str (optional)}}.
+    """,
+    [("history", "Conversation history"), ("query", "User query")],
+)
+
+SUB_QUERY_BATCH_CLASSIFY_PROMPT = PromptTemplate(
+    "sub_query_batch_classify",
+    f"""
+    Classify each of the user's queries below into one of the following intents: {', '.join(INTENTS)}.
+    {SUB_QUERY_RULES}
+    Response as a JSON array with one object per query, in the same order: [{{"intent": str, "clarifying_question": str (optional)}}, ...].
+    """,
+    [("history", "Conversation history"), ("queries", "Queries")],
+)
+
+SUB_QUERY_ANSWER_PROMPT = PromptTemplate(
+    "sub_query_answer",
+    """
+    Answer the query using ONLY the provided data for the given intent. Use concise, natural language (1-2 sentences, up to 5 if needed). Use conversation history for context. Treat synonyms (e.g., 'hybrid'/'variety', 'compost'/'manure') as equivalent.
+    """,
+    [("intent", "Intent"), ("data", "Data"), ("history", "Conversation history"), ("query", "User query")],
+    shrinkable=["data"],
+)
+
+PROMPT_TEMPLATES: List[PromptTemplate] = [
+    CLASSIFY_PROMPT,
+    ANSWER_PROMPT,
+    SUB_QUERY_CLASSIFY_PROMPT,
+    SUB_QUERY_BATCH_CLASSIFY_PROMPT,
+    SUB_QUERY_ANSWER_PROMPT,
+]
@@ -0,0 +1,198 @@
+"""Client-side protection for the LLM backend: an adaptive token-bucket rate limiter and a circuit breaker."""
+from typing import Any, Callable, Dict, Optional, Text
+import asyncio
+import threading
+import time
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+# Numeric state for metrics
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class LLMUnavailableError(Exception):
+    """The LLM call was not attempted because the backend is being protected."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+class RateLimitedError(LLMUnavailableError):
+    pass
+
+
+class TokenBucket:
+    """Token bucket matched to the API quota, shrinking its rate on 429s and recovering on successes.
+
+    Callers reserve a token and sleep until it is due, so waiters are served in order. A caller
+    who would wait longer than `max_wait` is rejected instead.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        max_wait: float,
+        min_rate_fraction: float = 0.1,
+        recovery_fraction: float = 0.05,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.max_wait = max_wait
+        self.min_rate = rate * min_rate_fraction
+        self.recovery = rate * recovery_fraction
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.rejected = 0
+        self.throttled = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it; raises RateLimitedError past max_wait."""
+        with self._lock:
+            self._refill(self._clock())
+            wait = max(0.0, (1.0 - self._tokens) / self.rate)
+            if wait > self.max_wait:
+                self.rejected += 1
+                raise RateLimitedError(f"LLM rate limit reached, next slot in {wait:.1f}s")
+            self._tokens -= 1.0
+            self.acquired += 1
+            return wait
+
+    async def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def throttle(self, retry_after: Optional[float] = None) -> None:
+        """The backend rate-limited us: halve the rate and, if told, pause for `retry_after` seconds."""
+        with self._lock:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                self._refill(self._clock())
+                self._tokens = min(self._tokens, -retry_after * self.rate)
+
+    def recover(self) -> None:
+        with self._lock:
+            self.rate = min(self.base_rate, self.rate + self.recovery)
+
+    def stats(self) -> Dict[Text, Any]:
+        return {
+            "rate_per_second": self.rate,
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+        }
+
+
+class CircuitBreaker:
+    """Stops calling a failing backend and lets a single probe through after a cooldown.
+
+    Opens after `failure_threshold` consecutive failures, where a call slower than `slo` also
+    counts as a failure. After `cooldown` seconds one half-open probe is allowed; its success
+    closes the breaker and its failure reopens it. A probe that never reports back (e.g. it was
+    cancelled) is replaced by a new one after another cooldown.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        slo: float,
+        cooldown: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.slo = slo
+        self.cooldown = cooldown
+        self._clock = clock
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> Text:
+        with self._lock:
+            return self._current_state(self._clock())
+
+    def _current_state(self, now: float) -> Text:
+        if self._state == OPEN and now - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probe_started = None
+        return self._state
+
+    def _probe_available(self, now: float) -> bool:
+        return self._probe_started is None or now - self._probe_started >= self.cooldown
+
+    def rejecting(self) -> bool:
+        """True if a call made now would be rejected (does not claim the half-open probe)."""
+        with self._lock:
+            now = self._clock()
+            state = self._current_state(now)
+            return state == OPEN or (state == HALF_OPEN and not self._probe_available(now))
+
+    def allow(self) -> bool:
+        """Claim permission for one call; in the half-open state only the probe is allowed."""
+        with self._lock:
+            now = self._clock()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probe_available(now):
+                self._probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self) -> None:
+        """Give back a claimed half-open probe whose call ended without saying anything about the backend.
+
+        For calls rejected locally after allow() (e.g. by the rate limiter) or failing with a
+        non-retryable client error, so the next call can probe instead of waiting a cooldown.
+        """
+        with self._lock:
+            if self._current_state(self._clock()) == HALF_OPEN:
+                self._probe_started = None
+
+    def record_success(self, latency: float) -> None:
+        if latency > self.slo:
+            self.record_failure()
+            return
+        with self._lock:
+            self.consecutive_failures = 0
+            self._state = CLOSED
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            state = self._current_state(self._clock())
+            if state == HALF_OPEN or (state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._probe_started = None
+                self.opened += 1
+
+    def stats(self) -> Dict[Text, Any]:
+        state = self.state
+        return {
+            "state": STATE_CODES[state],
+            "open": int(state == OPEN),
+            "consecutive_failures": self.consecutive_failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
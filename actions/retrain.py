@@ -0,0 +1,170 @@
+"""Retrain the Rasa model after data/nlu.yml changes, fine-tuning on the changed examples only.
+
+A manifest next to the models records the NLU examples, config and core data the latest model
+was trained on. When only NLU examples were added, the latest model is fine-tuned
+(`rasa train --finetune`) on the added examples plus a small replay sample of unchanged ones
+per intent, so it does not drift away from what it already knew. A full `rasa train` runs
+instead when there is no model or manifest yet, when an intent was added or removed, when
+examples were removed or edited (fine-tuning cannot unlearn them), when the config or the
+stories, rules or domain changed, or when more than --max-changed of the examples are new.
+
+    python -m actions.retrain --config config.fast.yml
+    python -m actions.retrain --config config.fast.yml --dry-run   # only report what would run
+"""
+from typing import Any, Dict, List, Optional, Text, Tuple
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from actions.nlu_data import NLU_PATH, PROJECT_ROOT, load_annotated_nlu_examples, write_nlu_examples
+
+MODELS_DIR = os.path.join(PROJECT_ROOT, "models")
+MANIFEST_PATH = os.path.join(MODELS_DIR, "nlu_manifest.json")
+CORE_FILES = [os.path.join(PROJECT_ROOT, name) for name in ("domain.yml", "data/stories.yml", "data/rules.yml")]
+
+
+def file_digest(paths: List[Text]) -> Text:
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def diff_examples(
+    previous: Dict[Text, List[Text]], current: Dict[Text, List[Text]]
+) -> Tuple[Dict[Text, List[Text]], Dict[Text, List[Text]]]:
+    """Return ({intent: added examples}, {intent: removed examples})."""
+    added, removed = {}, {}
+    for intent in set(previous) | set(current):
+        before, after = set(previous.get(intent, [])), set(current.get(intent, []))
+        if after - before:
+            added[intent] = [example for example in current[intent] if example not in before]
+        if before - after:
+            removed[intent] = [example for example in previous[intent] if example not in after]
+    return added, removed
+
+
+def finetune_examples(
+    current: Dict[Text, List[Text]], added: Dict[Text, List[Text]], replay: int, seed: int = 0
+) -> Dict[Text, List[Text]]:
+    """Added examples plus up to `replay` unchanged examples of every intent.
+
+    Every intent must appear in the fine-tuning data, or the fine-tuned model would lose it.
+    """
+    rng = random.Random(seed)
+    examples = {}
+    for intent, intent_examples in current.items():
+        new = added.get(intent, [])
+        new_set = set(new)
+        unchanged = [example for example in intent_examples if example not in new_set]
+        examples[intent] = new + rng.sample(unchanged, min(replay, len(unchanged)))
+    return examples
+
+
+def plan(
+    manifest: Optional[Dict[Text, Any]],
+    current: Dict[Text, List[Text]],
+    config_digest: Text,
+    core_digest: Text,
+    max_changed: float,
+) -> Tuple[Text, Text, Dict[Text, List[Text]]]:
+    """Return ("none" | "finetune" | "full", reason, added examples)."""
+    if manifest is None or not os.path.exists(manifest.get("model", "")):
+        return "full", "no previous model", {}
+    if manifest["config_digest"] != config_digest:
+        return "full", "the config changed", {}
+    if manifest["core_digest"] != core_digest:
+        return "full", "the domain, stories or rules changed", {}
+    previous = manifest["examples"]
+    if set(previous) != set(current):
+        return "full", "intents were added or removed", {}
+    added, removed = diff_examples(previous, current)
+    if removed:
+        return "full", f"{sum(map(len, removed.values()))} examples were removed or edited", {}
+    changed = sum(map(len, added.values()))
+    if changed == 0:
+        return "none", "no NLU changes", {}
+    total = sum(map(len, current.values()))
+    if changed > max_changed * total:
+        return "full", f"{changed} of {total} examples are new (over {max_changed:.0%})", {}
+    return "finetune", f"{changed} new examples in {', '.join(sorted(added))}", added
+
+
+def latest_model(models_dir: Text) -> Optional[Text]:
+    models = glob.glob(os.path.join(models_dir, "*.tar.gz"))
+    return max(models, key=os.path.getmtime) if models else None
+
+
+def rasa_train(args: List[Text]) -> float:
+    """Run `rasa train` with the given arguments and return the wall-clock seconds it took."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "rasa", "train", *args], cwd=PROJECT_ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default=os.path.join(PROJECT_ROOT, "config.yml"))
+    parser.add_argument("--nlu", default=NLU_PATH)
+    parser.add_argument("--out", default=MODELS_DIR, help="Directory for trained models")
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    parser.add_argument("--replay", type=int, default=5, help="Unchanged examples per intent added to the fine-tuning data")
+    parser.add_argument("--epoch-fraction", type=float, default=0.5, help="Share of the configured epochs used to fine-tune")
+    parser.add_argument("--max-changed", type=float, default=0.2, help="Above this share of new examples, train from scratch")
+    parser.add_argument("--full", action="store_true", help="Always train from scratch")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    current = load_annotated_nlu_examples(args.nlu)
+    config_digest = file_digest([args.config])
+    core_digest = file_digest(CORE_FILES)
+    manifest = None
+    if os.path.exists(args.manifest):
+        with open(args.manifest, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    mode, reason, added = plan(manifest, current, config_digest, core_digest, args.max_changed)
+    if args.full and mode != "full":
+        mode, reason = "full", "--full was given"
+    print(f"{mode}: {reason}")
+    if mode == "none" or args.dry_run:
+        return
+
+    core_data = [os.path.join(PROJECT_ROOT, "data", name) for name in ("stories.yml", "rules.yml")]
+    common = ["--config", args.config, "--domain", os.path.join(PROJECT_ROOT, "domain.yml"), "--out", args.out]
+    if mode == "full":
+        seconds = rasa_train([*common, "--data", args.nlu, *core_data])
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            nlu_path = os.path.join(tmp, "nlu.yml")
+            examples = finetune_examples(current, added, args.replay)
+            write_nlu_examples(nlu_path, examples)
+            print(f"fine-tuning {manifest['model']} on {sum(map(len, examples.values()))} examples")
+            seconds = rasa_train([
+                *common, "--data", nlu_path, *core_data,
+                "--finetune", manifest["model"], "--epoch-fraction", str(args.epoch_fraction),
+            ])
+
+    model = latest_model(args.out)
+    os.makedirs(os.path.dirname(args.manifest) or ".", exist_ok=True)
+    with open(args.manifest, "w", encoding="utf-8") as f:
+        json.dump({
+            "model": model,
+            "mode": mode,
+            "config_digest": config_digest,
+            "core_digest": core_digest,
+            "examples": current,
+        }, f, ensure_ascii=False, indent=1)
+    print(f"{mode} training took {seconds:.1f}s -> {model}")
+
+
+if __name__ == "__main__":
+    main()
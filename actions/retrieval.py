@@ -0,0 +1,213 @@
+"""BM25 retrieval over knowledge-base facts and answer examples.
+
+Each fact ("<fact name>: <text>") is a chunk. Queries and chunks go through normalize_spelling,
+so synonyms from SPELLING_VARIATIONS ('hybrid'/'variety', 'compost'/'manure', ...) match each other.
+"""
+from typing import Dict, List, Mapping, Optional, Sequence, Text, Tuple
+import logging
+import math
+import os
+import re
+import threading
+
+from actions.knowledge_base import KnowledgeBase, get_knowledge_base
+from actions.normalizer import normalize_spelling
+from actions.prompts import ANSWER_EXAMPLES, AnswerExample, estimate_tokens, format_answer_examples
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", "3"))
+RETRIEVAL_EXAMPLES = int(os.environ.get("RETRIEVAL_EXAMPLES", "3"))
+RETRIEVAL_MIN_SCORE = float(os.environ.get("RETRIEVAL_MIN_SCORE", "1.0"))  # below this, send the whole section
+# Answer straight from the best fact, without an LLM call, when retrieval is unambiguous
+RETRIEVAL_DIRECT_ANSWER = os.environ.get("RETRIEVAL_DIRECT_ANSWER", "false").lower() == "true"
+RETRIEVAL_DIRECT_MIN_SCORE = float(os.environ.get("RETRIEVAL_DIRECT_MIN_SCORE", "2.0"))
+RETRIEVAL_DIRECT_MARGIN = float(os.environ.get("RETRIEVAL_DIRECT_MARGIN", "2.0"))  # top score / runner-up
+
+STOPWORDS = frozenset(
+    "a an and are about any at be best by can coconut coconuts do does for from give how i in is it "
+    "me my of on or our should tell the to what when where which why with you your".split()
+)
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: Text) -> List[Text]:
+    tokens = []
+    for token in TOKEN_RE.findall(normalize_spelling(text.lower().replace("_", " "))):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, documents: Sequence[Text], k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.doc_tokens = [tokenize(doc) for doc in documents]
+        self.doc_lengths = [len(tokens) for tokens in self.doc_tokens]
+        self.avg_length = sum(self.doc_lengths) / max(1, len(self.doc_lengths))
+        self.term_freqs: List[Dict[Text, int]] = []
+        doc_freq: Dict[Text, int] = {}
+        for tokens in self.doc_tokens:
+            counts: Dict[Text, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            self.term_freqs.append(counts)
+            for token in counts:
+                doc_freq[token] = doc_freq.get(token, 0) + 1
+        n = len(documents)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    def scores(self, query: Text) -> List[float]:
+        query_tokens = set(tokenize(query))
+        scores = []
+        for counts, length in zip(self.term_freqs, self.doc_lengths):
+            score = 0.0
+            for token in query_tokens:
+                tf = counts.get(token)
+                if tf:
+                    norm = self.k1 * (1 - self.b + self.b * length / self.avg_length)
+                    score += self.idf[token] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+    def top(self, query: Text, k: int) -> List[Tuple[int, float]]:
+        ranked = sorted(enumerate(self.scores(query)), key=lambda item: item[1], reverse=True)
+        return ranked[:k]
+
+
+def format_fact(name: Text, text: Text) -> Text:
+    # Named facts (e.g. varieties) need the name to make sense on their own
+    return text if name.islower() else f"{name}: {text}"
+
+
+class Retrieval:
+    """Facts and examples selected for one query."""
+
+    def __init__(
+        self,
+        intent: Text,
+        facts: Dict[Text, Text],
+        examples: List[AnswerExample],
+        scores: List[float],
+        full_tokens: int,
+        selected_tokens: int,
+    ) -> None:
+        self.intent = intent
+        self.facts = facts
+        self.examples = examples
+        self.scores = scores
+        self.full_tokens = full_tokens
+        self.selected_tokens = selected_tokens
+
+    @property
+    def facts_text(self) -> Text:
+        return str(self.facts)
+
+    @property
+    def examples_text(self) -> Text:
+        return format_answer_examples(self.examples)
+
+    @property
+    def direct_answer(self) -> Optional[Text]:
+        """The best fact's text if it is a confident, unambiguous match."""
+        if not self.scores or self.scores[0] < RETRIEVAL_DIRECT_MIN_SCORE:
+            return None
+        runner_up = self.scores[1] if len(self.scores) > 1 else 0.0
+        if runner_up and self.scores[0] / runner_up < RETRIEVAL_DIRECT_MARGIN:
+            return None
+        return format_fact(*next(iter(self.facts.items())))
+
+    @property
+    def fallback_answer(self) -> Text:
+        """An answer built from the knowledge base alone: the direct answer, else the selected facts."""
+        return self.direct_answer or " ".join(format_fact(name, text) for name, text in self.facts.items())
+
+
+class KnowledgeRetriever:
+    """Per-intent BM25 indexes over the facts of one knowledge-base version."""
+
+    def __init__(self, knowledge_base: KnowledgeBase, examples: Sequence[AnswerExample] = ANSWER_EXAMPLES) -> None:
+        self.knowledge_base = knowledge_base
+        self.fact_names: Dict[Text, List[Text]] = {}
+        self.indexes: Dict[Text, BM25Index] = {}
+        for intent, facts in knowledge_base.sections.items():
+            names = list(facts)
+            self.fact_names[intent] = names
+            self.indexes[intent] = BM25Index([f"{name}: {facts[name]}" for name in names])
+        self.examples = list(examples)
+        self.example_index = BM25Index([example.query for example in self.examples])
+        self.full_examples_tokens = estimate_tokens(format_answer_examples(self.examples))
+        self.prompt_tokens_full = 0
+        self.prompt_tokens_selected = 0
+        self._lock = threading.Lock()
+
+    def select_facts(
+        self, intent: Text, query: Text, k: int = RETRIEVAL_TOP_K, min_ratio: float = 0.5
+    ) -> Tuple[Dict[Text, Text], List[float]]:
+        """Top-k facts scoring at least `min_ratio` of the best, best first; the whole section if nothing scores well."""
+        facts: Mapping[Text, Text] = self.knowledge_base.sections[intent]
+        ranked = self.indexes[intent].top(query, len(facts))
+        scores = [score for _, score in ranked]
+        if not ranked or ranked[0][1] < RETRIEVAL_MIN_SCORE:
+            return dict(facts), []
+        names = self.fact_names[intent]
+        cutoff = ranked[0][1] * min_ratio
+        return {names[i]: facts[names[i]] for i, score in ranked[:k] if score >= cutoff}, scores
+
+    def select_examples(self, intent: Text, query: Text, k: int = RETRIEVAL_EXAMPLES) -> List[AnswerExample]:
+        """Most similar examples, preferring those for the same intent."""
+        scores = self.example_index.scores(query)
+        ranked = sorted(
+            range(len(self.examples)),
+            key=lambda i: (self.examples[i].intent == intent, scores[i]),
+            reverse=True,
+        )
+        return [self.examples[i] for i in ranked[:k]]
+
+    def retrieve(self, intent: Text, query: Text) -> Retrieval:
+        facts, scores = self.select_facts(intent, query)
+        examples = self.select_examples(intent, query)
+        full_tokens = estimate_tokens(self.knowledge_base.prompt_text[intent]) + self.full_examples_tokens
+        selected_tokens = estimate_tokens(str(facts)) + estimate_tokens(format_answer_examples(examples))
+        with self._lock:
+            self.prompt_tokens_full += full_tokens
+            self.prompt_tokens_selected += selected_tokens
+        logger.debug(
+            "Retrieved %s facts and %s examples for '%s', ~%s prompt tokens saved",
+            len(facts), len(examples), intent, full_tokens - selected_tokens,
+        )
+        return Retrieval(intent, facts, examples, scores, full_tokens, selected_tokens)
+
+    def stats(self) -> Dict[Text, float]:
+        with self._lock:
+            saved = self.prompt_tokens_full - self.prompt_tokens_selected
+            return {
+                "prompt_tokens_full": self.prompt_tokens_full,
+                "prompt_tokens_selected": self.prompt_tokens_selected,
+                "prompt_tokens_saved": saved,
+                "savings_ratio": saved / self.prompt_tokens_full if self.prompt_tokens_full else 0.0,
+            }
+
+
+_retriever: Optional[KnowledgeRetriever] = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever() -> KnowledgeRetriever:
+    """Return the retriever for the current knowledge base, rebuilding it after a reload."""
+    global _retriever
+    knowledge_base = get_knowledge_base()
+    if _retriever is None or _retriever.knowledge_base is not knowledge_base:
+        with _retriever_lock:
+            if _retriever is None or _retriever.knowledge_base is not knowledge_base:
+                previous = _retriever
+                _retriever = KnowledgeRetriever(knowledge_base)
+                if previous is not None:
+                    # Keep the savings counters across knowledge-base reloads
+                    _retriever.prompt_tokens_full = previous.prompt_tokens_full
+                    _retriever.prompt_tokens_selected = previous.prompt_tokens_selected
+    return _retriever
@@ -0,0 +1,167 @@
+"""Answer cache keyed by meaning rather than by exact text.
+
+Queries are embedded as signed hashed word, bigram and character n-gram vectors over the
+retrieval tokens (normalized, stopwords dropped), so no model is needed. Each intent has
+its own NumPy matrix of unit vectors. A lookup is one matrix-vector product, and the
+nearest cached query counts as a hit above SEMANTIC_CACHE_THRESHOLD. Evaluate the
+threshold on the data/nlu.yml paraphrases with benchmarks/eval_semantic_cache.py.
+"""
+from typing import Any, Dict, FrozenSet, List, Optional, Text, Tuple
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from actions.cache import ANSWER_CACHE_TTL
+from actions.retrieval import tokenize
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "512"))  # per intent
+SEMANTIC_CACHE_DIM = int(os.environ.get("SEMANTIC_CACHE_DIM", "2048"))
+
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+# Relative weights of the feature kinds; words carry most of the meaning, character n-grams absorb typos
+WORD_WEIGHT = 1.0
+BIGRAM_WEIGHT = 0.5
+CHAR_WEIGHT = 0.25
+
+
+def numbers(text: Text) -> FrozenSet[Text]:
+    """Numbers in the query. Queries that differ in them ("2 year" vs "5 year") need different answers."""
+    return frozenset(NUMBER_RE.findall(text))
+
+
+def embed(text: Text, dim: int = SEMANTIC_CACHE_DIM) -> np.ndarray:
+    """Unit-length signed feature-hashing vector of the query (all zeros if it has no content words)."""
+    tokens = tokenize(text)
+    grams = [(f"w:{t}", WORD_WEIGHT) for t in tokens]
+    grams += [(f"b:{a} {b}", BIGRAM_WEIGHT) for a, b in zip(tokens, tokens[1:])]
+    for token in tokens:
+        padded = f" {token} "
+        grams += [(f"c:{padded[i:i + 3]}", CHAR_WEIGHT) for i in range(len(padded) - 2)]
+    vector = np.zeros(dim, dtype=np.float32)
+    for gram, weight in grams:
+        h = zlib.crc32(gram.encode("utf-8"))
+        vector[h % dim] += weight if h & 0x80000000 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _IntentEntries:
+    """Preallocated rows for one intent, with LRU bookkeeping in parallel arrays."""
+
+    def __init__(self, capacity: int, dim: int) -> None:
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+        self.expires = np.zeros(capacity, dtype=np.float64)
+        self.queries: List[Optional[Text]] = [None] * capacity
+        self.answers: List[Optional[Text]] = [None] * capacity
+        self.numbers: List[FrozenSet[Text]] = [frozenset()] * capacity
+        self.size = 0
+
+
+class SemanticCache:
+    """Per-intent nearest-neighbour answer cache with LRU eviction and TTL."""
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        dim: int = SEMANTIC_CACHE_DIM,
+        ttl: float = ANSWER_CACHE_TTL,
+    ) -> None:
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dim = dim
+        self.ttl = ttl
+        self._intents: Dict[Text, _IntentEntries] = {}
+        self._clock = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _search(self, entries: _IntentEntries, vector: np.ndarray, query_numbers: FrozenSet[Text]) -> Tuple[int, float]:
+        """Index and similarity of the closest live entry with the same numbers, or (-1, best score)."""
+        size = entries.size
+        scores = entries.vectors[:size] @ vector
+        scores[entries.expires[:size] < time.time()] = -1.0
+        best_score = float(scores.max()) if size else -1.0
+        candidates = np.flatnonzero(scores >= self.threshold)
+        for i in candidates[np.argsort(-scores[candidates])]:
+            if entries.numbers[i] == query_numbers:
+                return int(i), float(scores[i])
+        return -1, best_score
+
+    def lookup(self, intent: Text, query: Text) -> Optional[Tuple[Text, Text, float]]:
+        """Return (answer, cached query, similarity) for the closest cached paraphrase, or None."""
+        vector = embed(query, self.dim)
+        with self._lock:
+            entries = self._intents.get(intent)
+            if entries is None or entries.size == 0 or not vector.any():
+                self.misses += 1
+                return None
+            i, score = self._search(entries, vector, numbers(query))
+            if i < 0:
+                self.misses += 1
+                logger.debug("Semantic cache miss for '%s' (best similarity %.2f)", query, score)
+                return None
+            self._clock += 1
+            entries.last_used[i] = self._clock
+            self.hits += 1
+            return entries.answers[i], entries.queries[i], score
+
+    def put(self, intent: Text, query: Text, answer: Text) -> None:
+        vector = embed(query, self.dim)
+        if not vector.any():
+            return
+        query_numbers = numbers(query)
+        with self._lock:
+            entries = self._intents.get(intent)
+            if entries is None:
+                entries = self._intents[intent] = _IntentEntries(self.max_entries, self.dim)
+            # A near-identical query replaces its entry rather than taking another row
+            scores = entries.vectors[:entries.size] @ vector
+            duplicates = [i for i in np.flatnonzero(scores >= 0.999) if entries.numbers[i] == query_numbers]
+            if duplicates:
+                i = int(duplicates[0])
+            elif entries.size < self.max_entries:
+                i = entries.size
+                entries.size += 1
+            else:
+                # Expired rows have the oldest possible use time, so they go first
+                last_used = np.where(entries.expires < time.time(), -1, entries.last_used)
+                i = int(np.argmin(last_used))
+                self.evictions += 1
+            self._clock += 1
+            entries.vectors[i] = vector
+            entries.last_used[i] = self._clock
+            entries.expires[i] = time.time() + self.ttl
+            entries.queries[i] = query
+            entries.answers[i] = answer
+            entries.numbers[i] = query_numbers
+
+    def clear(self) -> None:
+        with self._lock:
+            self._intents.clear()
+
+    def stats(self) -> Dict[Text, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": sum(entries.size for entries in self._intents.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+semantic_cache = SemanticCache()
@@ -0,0 +1,36 @@
+from typing import List, Text
+import re
+
+# Words that end with a period without ending the sentence
+ABBREVIATIONS = {"e.g", "i.e", "etc", "vs", "viz", "approx", "dr", "mr", "mrs", "ms", "st", "fig", "sq"}
+
+# Sentence-ending punctuation (plus closing quotes/brackets) followed by whitespace or the end of text
+SENTENCE_END_RE = re.compile(r'[.!?]+["\')\]]*(?=\s|$)')
+
+
+def split_sentences(text: Text) -> List[Text]:
+    """Split text into sentences with simple punctuation rules.
+
+    Good enough for short farmer messages and LLM answers, and needs no model download
+    (unlike NLTK's punkt). Abbreviations, initials, decimals like "1.8" and list markers
+    like "1." do not end a sentence.
+    """
+    sentences = []
+    start = 0
+    for match in SENTENCE_END_RE.finditer(text):
+        if match.group().rstrip("\"')]") == ".":
+            before = text[start:match.start()]
+            words = before.split()
+            word = words[-1].lstrip("\"'([").lower() if words else ""
+            if word in ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+                continue
+            if word.isdigit() and len(words) == 1:
+                continue
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
@@ -0,0 +1,160 @@
+"""Run the action server as several preforked worker processes on one port.
+
+`rasa run actions` serves every request from one process, so CPU-bound work (normalization,
+keyword regexes, JSON parsing, the local classifier and retrieval) shares a single core with
+the I/O. This launcher imports the actions and runs the warm-up steps (knowledge base,
+retrieval index, precomputed answers, local classifier, caches) once, freezes the loaded
+objects out of the garbage collector and then forks --workers processes. The workers start
+serving immediately and share that read-only memory copy-on-write.
+
+Each worker opens its own listening socket on the port with SO_REUSEPORT, so the kernel spreads
+new connections across them; where SO_REUSEPORT is not available the workers accept on one
+socket opened by the parent. A worker that dies is restarted. SIGTERM or SIGINT stops them all.
+
+Per-process state stays per worker: the in-memory caches (use CACHE_BACKEND=sqlite or redis to
+share them), the LLM client with its concurrency and rate limits, and the metrics. Worker i
+serves /metrics on METRICS_PORT + i (METRICS_PORT=0 disables).
+
+    python -m actions.server --workers 4 --port 5055
+"""
+from typing import Dict, Optional, Text
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# A worker that exits sooner than this after starting is restarted only after a pause
+MIN_WORKER_UPTIME = 5.0
+
+
+def listen(host: Text, port: int, reuse_port: bool, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(
+    index: int,
+    executor,
+    args: argparse.Namespace,
+    shared_socket: Optional[socket.socket],
+    metrics_port: int,
+) -> None:
+    """Body of a worker process."""
+    from rasa_sdk.endpoint import create_app_for_serve
+
+    from actions.metrics import start_metrics_server
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if metrics_port:
+        start_metrics_server(port=metrics_port + index)
+    sock = shared_socket or listen(args.host, args.port, True, args.backlog)
+    app = create_app_for_serve(
+        executor,
+        cors_origins=args.cors,
+        endpoints=args.endpoints,
+        keep_alive_timeout=args.keep_alive_timeout,
+    )
+    app.run(sock=sock, single_process=True, access_log=False, motd=False, backlog=args.backlog)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--host", default=os.environ.get("SANIC_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--actions", default="actions", help="Package the actions are loaded from")
+    parser.add_argument("--endpoints", default="endpoints.yml", help="Used for the tracing configuration")
+    parser.add_argument("--cors", nargs="*", default="*")
+    parser.add_argument("--keep-alive-timeout", type=int, default=120)
+    parser.add_argument("--backlog", type=int, default=1024)
+    parser.add_argument("--shared-socket", action="store_true", help="Accept on one inherited socket instead of SO_REUSEPORT")
+    args = parser.parse_args()
+
+    # The parent runs the warm-up itself and serves no metrics; each worker starts its own endpoint
+    metrics_port = int(os.environ.get("METRICS_PORT", "5056"))
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["WARM_UP_ON_START"] = "false"
+
+    from rasa_sdk.executor import ActionExecutor
+
+    from actions.warmup import warm_up
+
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
+    start = time.perf_counter()
+    executor = ActionExecutor()
+    executor.register_package(args.actions)
+    warm_up()
+    # Keep the collector from touching (and so copying) the inherited objects in every worker
+    gc.collect()
+    gc.freeze()
+    logger.info("Loaded actions and warm state in %.0f ms", (time.perf_counter() - start) * 1000)
+
+    reuse_port = hasattr(socket, "SO_REUSEPORT") and not args.shared_socket
+    shared_socket = None if reuse_port else listen(args.host, args.port, False, args.backlog)
+    workers: Dict[int, int] = {}  # pid -> worker index
+    started: Dict[int, float] = {}
+    stopping = False
+
+    def spawn(index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                serve(index, executor, args, shared_socket, metrics_port)
+            except BaseException:
+                logger.exception("Worker %s failed", index)
+                code = 1
+            finally:
+                logging.shutdown()
+                os._exit(code)
+        workers[pid] = index
+        started[pid] = time.monotonic()
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(args.workers):
+        spawn(index)
+    mode = "SO_REUSEPORT" if reuse_port else "a shared socket"
+    logger.info("Action server with %s workers on http://%s:%s using %s", args.workers, args.host, args.port, mode)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = workers.pop(pid)
+        uptime = time.monotonic() - started.pop(pid)
+        if stopping:
+            continue
+        logger.error("Worker %s (pid %s) exited with status %s; restarting", index, pid, os.waitstatus_to_exitcode(status))
+        if uptime < MIN_WORKER_UPTIME:
+            time.sleep(MIN_WORKER_UPTIME)
+        if not stopping:
+            spawn(index)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
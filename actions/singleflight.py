@@ -0,0 +1,53 @@
+from typing import Any, Awaitable, Callable, Dict, Text, TypeVar
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one in-flight task.
+
+    The first caller for a key starts the work; callers arriving while it runs await the same
+    task and receive its result or its exception. The task is shielded, so a caller that is
+    cancelled (e.g. by a deadline) does not cancel the work for the others.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[Text, "asyncio.Task[Any]"] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(self, key: Text, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+        else:
+            self.coalesced += 1
+            logger.debug("Coalesced request for in-flight key: %s", key)
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Text, task: "asyncio.Task[Any]") -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Retrieve the exception so it is never reported as unhandled when every waiter went away
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict[Text, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "in_flight": len(self._in_flight),
+        }
+
+
+# Shared by all classify/answer LLM calls; keys are the corresponding cache keys
+llm_singleflight = SingleFlight()
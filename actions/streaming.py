@@ -0,0 +1,44 @@
+from typing import TYPE_CHECKING, AsyncIterator, Callable, List, Optional, Text
+import os
+
+if TYPE_CHECKING:
+    import httpx
+
+# Stream answers sentence by sentence instead of waiting for the full completion
+ANSWER_STREAMING = os.environ.get("ANSWER_STREAMING", "false").lower() == "true"
+# Optional URL receiving each sentence as soon as it is complete, as {"recipient_id": ..., "text": ...}
+# (the payload of Rasa's callback channel). Without it, sentences are sent through the dispatcher and
+# reach the user when the action finishes.
+ANSWER_STREAM_PUSH_URL = os.environ.get("ANSWER_STREAM_PUSH_URL")
+
+
+async def stream_sentences(
+    deltas: AsyncIterator[Text], split: Callable[[Text], List[Text]]
+) -> AsyncIterator[Text]:
+    """Group streamed text deltas into sentences, yielding each one once it is complete."""
+    buffer = ""
+    async for delta in deltas:
+        buffer += delta
+        sentences = split(buffer)
+        if len(sentences) > 1:
+            for sentence in sentences[:-1]:
+                yield sentence.strip()
+            # Keep only the unfinished last sentence
+            tail = buffer.rfind(sentences[-1])
+            buffer = buffer[tail:] if tail != -1 else sentences[-1]
+    if buffer.strip():
+        yield buffer.strip()
+
+
+_push_client: Optional["httpx.AsyncClient"] = None
+
+
+async def push_sentence(recipient_id: Text, text: Text, url: Text = ANSWER_STREAM_PUSH_URL) -> None:
+    """POST one sentence to the push URL."""
+    global _push_client
+    if _push_client is None:
+        import httpx
+
+        _push_client = httpx.AsyncClient(timeout=5.0)
+    response = await _push_client.post(url, json={"recipient_id": recipient_id, "text": text})
+    response.raise_for_status()
@@ -0,0 +1,72 @@
+from typing import Callable, Dict, List, Optional, Text, Tuple
+import importlib
+import logging
+import os
+import threading
+import time
+
+from actions.answer_store import get_answer_store
+from actions.cache import CACHE_WARM_START, answer_cache, classify_cache
+from actions.knowledge_base import get_knowledge_base
+from actions.retrieval import get_retriever
+
+logger = logging.getLogger(__name__)
+
+# Load the knowledge base, indexes, precomputed answers, local model and caches in a background thread at startup
+WARM_UP_ON_START = os.environ.get("WARM_UP_ON_START", "true").lower() == "true"
+
+# Seconds taken by each finished step
+warm_up_timings: Dict[Text, float] = {}
+warm_up_done = threading.Event()
+
+
+def _load_local_classifier() -> None:
+    # Deferred import: numpy is only needed once the classifier is used
+    from actions.intent_classifier import get_local_classifier
+
+    get_local_classifier()
+
+
+def _warm_caches() -> None:
+    for cache in (classify_cache, answer_cache):
+        cache.warm(CACHE_WARM_START)
+
+
+def _import_llm_client_modules() -> None:
+    # The client itself must be created on the server's event loop; importing is the slow part
+    for module in ("httpx", "groq"):
+        importlib.import_module(module)
+
+
+WARM_UP_STEPS: List[Tuple[Text, Callable[[], None]]] = [
+    ("knowledge_base", get_knowledge_base),
+    ("retrieval_index", get_retriever),
+    ("precomputed_answers", get_answer_store),
+    ("local_classifier", _load_local_classifier),
+    ("caches", _warm_caches),
+    ("llm_client_modules", _import_llm_client_modules),
+]
+
+
+def warm_up() -> Dict[Text, float]:
+    """Run every warm-up step, logging (not raising) failures; returns the step timings."""
+    for name, step in WARM_UP_STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.error("Warm-up step %s failed: %s", name, e)
+            continue
+        warm_up_timings[name] = time.perf_counter() - start
+    warm_up_done.set()
+    logger.info("Warm-up finished in %.0f ms", sum(warm_up_timings.values()) * 1000)
+    return dict(warm_up_timings)
+
+
+def start_warm_up() -> Optional[threading.Thread]:
+    """Start warm_up() in a daemon thread so the server can accept requests meanwhile."""
+    if not WARM_UP_ON_START:
+        return None
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
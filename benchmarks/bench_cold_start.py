@@ -0,0 +1,73 @@
+"""Action-server cold start: import time of actions.actions and time to the first answered request.
+
+Each run is a fresh interpreter that imports the actions and then answers one classify + answer
+turn against a local fake LLM. Pass --root to measure another checkout (e.g. a git worktree
+of an older commit) for a before/after comparison.
+
+    python benchmarks/bench_cold_start.py --runs 5
+    git worktree add /tmp/before HEAD~1 && python benchmarks/bench_cold_start.py --root /tmp/before
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import FakeLLMServer  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import time
+start = time.perf_counter()
+import asyncio, json
+import actions.actions as actions_module
+imported = time.perf_counter()
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+async def first_request():
+    text = "which coconut suits my land"
+    tracker = Tracker("cold", {}, {"text": text}, [{"event": "user", "text": text}], False, None, {}, "action_listen")
+    events = await actions_module.ActionClassifyIntent().run(CollectingDispatcher(), tracker, {})
+    intent = next((e["value"] for e in events if e.get("event") == "slot"), "climate_soils")
+    tracker = Tracker("cold", {"classified_intent": intent}, {"text": text}, [{"event": "user", "text": text}], False, None, {}, "action_listen")
+    await actions_module.ActionAnswerQuery().run(CollectingDispatcher(), tracker, {})
+
+asyncio.run(first_request())
+ready = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "first_request_ms": (ready - imported) * 1000}))
+"""
+
+
+def run_once(root: str, base_url: str) -> dict:
+    env = dict(os.environ, GROQ_BASE_URL=base_url, LOG_LEVEL="ERROR", METRICS_PORT="0", PYTHONPATH=root)
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=root, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_to_ready_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=ROOT, help="Project checkout to measure")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM latency in seconds")
+    args = parser.parse_args()
+
+    with FakeLLMServer(latency=args.latency) as server:
+        runs = [run_once(args.root, server.base_url) for _ in range(args.runs)]
+    print(f"{args.root}: median of {args.runs} runs, fake LLM latency {args.latency * 1000:.0f} ms")
+    for key in ("import_ms", "first_request_ms", "process_to_ready_ms"):
+        print(f"  {key:<22}{statistics.median(run[key] for run in runs):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Wall-clock latency of ActionHandleMultiIntent for 1, 2 and 3 sub-queries against a fake LLM.
+
+Compares one-call-at-a-time processing (LLM concurrency 1, the old behaviour) with concurrent
+fan-out, with and without batched classification. Cache, keyword and local-classifier shortcuts
+are bypassed so every sub-query exercises the LLM path.
+
+    python benchmarks/bench_multi_intent.py --latency 0.3 --repeat 3
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import FakeLLMServer  # noqa: E402
+
+SUB_QUERIES = [
+    "tell me about the ganga hybrids",
+    "why do leaves turn yellow",
+    "which soil suits palms",
+]
+
+
+async def run_once(action, n: int) -> float:
+    from actions.cache import answer_cache, classify_cache
+
+    classify_cache.clear()
+    answer_cache.clear()
+    start = time.perf_counter()
+    await action.answer_sub_queries(SUB_QUERIES[:n], [])
+    return time.perf_counter() - start
+
+
+async def bench(mode: str, concurrency: int, batch: bool, base_url: str, repeat: int) -> None:
+    import actions.actions as actions_module
+    import actions.llm_client as llm_client
+
+    llm_client._llm_client = llm_client.LLMClient(base_url=base_url, max_concurrency=concurrency, max_retries=0)
+    actions_module.MULTI_INTENT_BATCH_CLASSIFY = batch
+    action = actions_module.ActionHandleMultiIntent()
+
+    async def no_shortcut(normalized_query: str) -> None:
+        return None
+
+    action._classify_without_llm = no_shortcut
+
+    timings = []
+    for n in (1, 2, 3):
+        runs = [await run_once(action, n) for _ in range(repeat)]
+        timings.append(min(runs))
+    print(f"{mode:<22}" + "".join(f"{t * 1000:>10.0f}" for t in timings))
+    await llm_client._llm_client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.3, help="Injected fake LLM latency in seconds")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with FakeLLMServer(latency=args.latency) as server:
+        print(f"fake LLM latency {args.latency * 1000:.0f} ms; best of {args.repeat}, wall-clock ms")
+        print(f"{'mode':<22}" + "".join(f"{f'{n} sub-q':>10}" for n in (1, 2, 3)))
+        for mode, concurrency, batch in [
+            ("sequential", 1, False),
+            ("concurrent", 32, False),
+            ("concurrent + batch", 32, True),
+        ]:
+            asyncio.run(bench(mode, concurrency, batch, server.base_url, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Micro-benchmark: precompiled SpellingNormalizer vs. the original per-word regex loop.
+
+    python benchmarks/bench_normalizer.py --repeat 20
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.nlu_data import load_nlu_examples  # noqa: E402
+from actions.normalizer import SPELLING_VARIATIONS, normalize_spelling  # noqa: E402
+
+
+def legacy_normalize_spelling(text: str) -> str:
+    """The original implementation, kept here as the reference."""
+    words = text.split()
+    normalized_words = []
+    for word in words:
+        clean_word = re.sub(r'[^\w\s]', '', word.lower())
+        for variation, standard in SPELLING_VARIATIONS.items():
+            if re.fullmatch(rf"{re.escape(variation)}(s)?", clean_word, re.IGNORECASE):
+                normalized_words.append(standard)
+                break
+        else:
+            normalized_words.append(clean_word)
+    return " ".join(normalized_words)
+
+
+def has_phrase(text: str) -> bool:
+    lowered = text.lower()
+    return any(" " in variation and variation in lowered for variation in SPELLING_VARIATIONS)
+
+
+def timeit(func, messages, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            func(message)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    messages = [m.lower() for examples in load_nlu_examples().values() for m in examples]
+
+    mismatches = [m for m in messages if not has_phrase(m) and normalize_spelling(m) != legacy_normalize_spelling(m)]
+    if mismatches:
+        print(f"Output differs from the original for {len(mismatches)} messages, e.g. {mismatches[0]!r}")
+        sys.exit(1)
+    phrase_hits = sum(1 for m in messages if has_phrase(m))
+
+    legacy = timeit(legacy_normalize_spelling, messages, args.repeat)
+    new = timeit(normalize_spelling, messages, args.repeat)
+    calls = len(messages) * args.repeat
+    print(f"messages: {len(messages)} x {args.repeat} (identical output; {phrase_hits} contain multi-word variations)")
+    print(f"legacy:      {legacy / calls * 1e6:8.2f} us/message")
+    print(f"precompiled: {new / calls * 1e6:8.2f} us/message")
+    print(f"speedup:     {legacy / new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
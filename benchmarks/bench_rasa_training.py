@@ -0,0 +1,144 @@
+"""Compare Rasa NLU pipeline profiles: training time, model size, parse latency and intent accuracy.
+
+data/nlu.yml is split per intent into a training set and a held-out test set. Each --config
+profile is trained from scratch on the training set and then evaluated on the test set.
+The incremental row simulates newly added examples: --new-fraction of the training examples
+is held back, the fast profile is trained on the rest, and the resulting model is fine-tuned
+on the new examples (plus the replay sample) the way `python -m actions.retrain` does.
+Requires Rasa to be installed.
+
+    python benchmarks/bench_rasa_training.py --configs config.yml config.fast.yml --output training.json
+"""
+from typing import Any, Dict, List, Text, Tuple
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.nlu_data import (  # noqa: E402
+    PROJECT_ROOT,
+    load_annotated_nlu_examples,
+    strip_entity_annotations,
+    write_nlu_examples,
+)
+from actions.retrain import finetune_examples  # noqa: E402
+
+
+def split(
+    examples: Dict[Text, List[Text]], holdout: float, seed: int
+) -> Tuple[Dict[Text, List[Text]], List[Tuple[Text, Text]]]:
+    """Stratified split into ({intent: training examples}, [(test text, intent)])."""
+    rng = random.Random(seed)
+    train, test = {}, []
+    for intent, intent_examples in examples.items():
+        items = list(intent_examples)
+        rng.shuffle(items)
+        cut = max(1, int(len(items) * holdout))
+        test.extend((strip_entity_annotations(text), intent) for text in items[:cut])
+        train[intent] = items[cut:]
+    return train, test
+
+
+def train_nlu(config: Text, nlu_path: Text, out: Text, name: Text, extra: List[Text] = ()) -> Tuple[Text, float]:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "rasa", "train", "nlu", "--config", config, "--nlu", nlu_path,
+         "--out", out, "--fixed-model-name", name, *extra],
+        cwd=PROJECT_ROOT, check=True, stdout=subprocess.DEVNULL,
+    )
+    return os.path.join(out, f"{name}.tar.gz"), time.perf_counter() - start
+
+
+def evaluate(model_path: Text, test: List[Tuple[Text, Text]]) -> Dict[Text, Any]:
+    from rasa.core.agent import Agent
+
+    agent = Agent.load(model_path)
+
+    async def parse_all() -> List[Tuple[Text, float]]:
+        results = []
+        for text, _ in test:
+            start = time.perf_counter()
+            parsed = await agent.parse_message(text)
+            results.append((parsed["intent"]["name"], (time.perf_counter() - start) * 1000))
+        return results
+
+    # Warm-up parse so that graph loading is not counted as latency
+    asyncio.run(agent.parse_message("hello"))
+    results = asyncio.run(parse_all())
+    latencies = sorted(latency for _, latency in results)
+    return {
+        "accuracy": sum(predicted == intent for (predicted, _), (_, intent) in zip(results, test)) / len(test),
+        "fallback_rate": sum(predicted == "nlu_fallback" for predicted, _ in results) / len(test),
+        "parse_ms_p50": statistics.median(latencies),
+        "parse_ms_p95": latencies[int(0.95 * (len(latencies) - 1))],
+    }
+
+
+def report_row(name: Text, model_path: Text, train_seconds: float, test: List[Tuple[Text, Text]]) -> Dict[Text, Any]:
+    row = {"profile": name, "train_s": train_seconds, "model_mb": os.path.getsize(model_path) / 1024 ** 2}
+    row.update(evaluate(model_path, test))
+    print(
+        f"{name:<28}{row['train_s']:>9.1f}{row['model_mb']:>10.2f}{row['parse_ms_p50']:>9.1f}"
+        f"{row['parse_ms_p95']:>9.1f}{row['accuracy']:>10.1%}{row['fallback_rate']:>10.1%}"
+    )
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", nargs="+", default=["config.yml", "config.fast.yml"])
+    parser.add_argument("--incremental-config", default="config.fast.yml", help="Profile used for the fine-tuning row")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--new-fraction", type=float, default=0.1, help="Share of training examples added incrementally")
+    parser.add_argument("--epoch-fraction", type=float, default=0.5)
+    parser.add_argument("--replay", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    train, test = split(load_annotated_nlu_examples(), args.holdout, args.seed)
+    rows = []
+    print(f"{sum(map(len, train.values()))} training / {len(test)} test examples")
+    print(f"{'profile':<28}{'train s':>9}{'model MB':>10}{'p50 ms':>9}{'p95 ms':>9}{'accuracy':>10}{'fallback':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        train_path = os.path.join(tmp, "train.yml")
+        write_nlu_examples(train_path, train)
+        for config in args.configs:
+            name = os.path.splitext(os.path.basename(config))[0]
+            model_path, seconds = train_nlu(os.path.join(PROJECT_ROOT, config), train_path, tmp, name)
+            rows.append(report_row(config, model_path, seconds, test))
+
+        # Incremental: base model without the "new" examples, then fine-tune on them
+        rng = random.Random(args.seed)
+        base, added = {}, {}
+        for intent, intent_examples in train.items():
+            new = set(rng.sample(intent_examples, int(len(intent_examples) * args.new_fraction)))
+            base[intent] = [example for example in intent_examples if example not in new]
+            added[intent] = [example for example in intent_examples if example in new]
+        config = os.path.join(PROJECT_ROOT, args.incremental_config)
+        base_path = os.path.join(tmp, "base.yml")
+        write_nlu_examples(base_path, base)
+        base_model, _ = train_nlu(config, base_path, tmp, "base")
+        finetune_path = os.path.join(tmp, "finetune.yml")
+        write_nlu_examples(finetune_path, finetune_examples(train, added, args.replay, args.seed))
+        model_path, seconds = train_nlu(
+            config, finetune_path, tmp, "finetuned",
+            ["--finetune", base_model, "--epoch-fraction", str(args.epoch_fraction)],
+        )
+        rows.append(report_row(f"{args.incremental_config} (fine-tune)", model_path, seconds, test))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
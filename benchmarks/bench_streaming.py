@@ -0,0 +1,93 @@
+"""Time to first sentence of ActionAnswerQuery, buffered vs streamed, against a fake streaming LLM.
+
+The fake server waits --latency seconds before the first word and --token-latency seconds per
+word after that. "first" is when the first sentence is handed to the dispatcher (or the push URL
+when ANSWER_STREAM_PUSH_URL is set); "total" is when the action returns.
+
+    python benchmarks/bench_streaming.py --latency 0.3 --token-latency 0.02 --repeat 3
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import FakeLLMServer  # noqa: E402
+
+QUERY = "how much fertilizer should i give a coconut tree"
+ANSWER = (
+    "Apply 1.3 kg of urea and 2 kg of muriate of potash per palm every year. "
+    "Split the dose into two applications, one at the start of the monsoon and one after it. "
+    "Spread the fertilizer in a circular basin about 1.8 m around the trunk and mix it into the soil. "
+    "Adding organic manure along with the fertilizer improves the uptake of nutrients."
+)
+
+
+def answer_responder(prompt: str, max_tokens: int) -> str:
+    return ANSWER
+
+
+async def run_once(streaming: bool) -> tuple:
+    from rasa_sdk import Tracker
+    from rasa_sdk.executor import CollectingDispatcher
+
+    import actions.actions as actions_module
+    from actions.cache import answer_cache
+
+    class TimedDispatcher(CollectingDispatcher):
+        first = None
+
+        def utter_message(self, *args, **kwargs) -> None:
+            if self.first is None:
+                self.first = time.perf_counter()
+            super().utter_message(*args, **kwargs)
+
+    actions_module.ANSWER_STREAMING = streaming
+    # Every run must reach the LLM: no exact or semantic cache hits from the previous one
+    actions_module.SEMANTIC_CACHE = False
+    answer_cache.clear()
+    tracker = Tracker(
+        "bench", {"classified_intent": "fertilizers"}, {"text": QUERY},
+        [{"event": "user", "text": QUERY}], False, None, {}, "action_listen",
+    )
+    dispatcher = TimedDispatcher()
+    start = time.perf_counter()
+    await actions_module.ActionAnswerQuery().run(dispatcher, tracker, {})
+    total = time.perf_counter() - start
+    return dispatcher.first - start, total, len(dispatcher.messages)
+
+
+async def bench(base_url: str, repeat: int) -> None:
+    import actions.llm_client as llm_client
+
+    llm_client._llm_client = llm_client.LLMClient(base_url=base_url, max_retries=0)
+    print(f"{'mode':<12}{'first ms':>10}{'total ms':>10}{'messages':>10}")
+    for mode, streaming in [("buffered", False), ("streaming", True)]:
+        runs = [await run_once(streaming) for _ in range(repeat)]
+        first, total, messages = min(runs)
+        print(f"{mode:<12}{first * 1000:>10.0f}{total * 1000:>10.0f}{messages:>10}")
+    await llm_client._llm_client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake LLM time to first token in seconds")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Fake LLM time per word in seconds")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # A precomputed store built locally would answer QUERY without the LLM; read when actions is imported
+    os.environ["PRECOMPUTED_ANSWERS"] = "false"
+    with FakeLLMServer(latency=args.latency, token_latency=args.token_latency, responder=answer_responder) as server:
+        print(
+            f"fake LLM latency {args.latency * 1000:.0f} ms + {args.token_latency * 1000:.0f} ms/word; "
+            f"best of {args.repeat}"
+        )
+        asyncio.run(bench(server.base_url, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
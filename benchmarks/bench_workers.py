@@ -0,0 +1,208 @@
+"""Throughput of the preforked action server (`python -m actions.server`) at several worker counts.
+
+For each --workers value the server is started against a fake LLM server in a separate process,
+and the load-test conversations (see load_test.py) are replayed over HTTP to /webhook, with
+--concurrency conversations in flight at a time. Reported per worker count: turns per second,
+turn latency percentiles, errors, and the proportional set size (PSS) of the server's processes,
+which counts memory shared copy-on-write between the workers only once.
+
+    python benchmarks/bench_workers.py --workers 1 4 16 --conversations 400 --concurrency 64
+
+The numbers only scale up to the number of free cores: on a 1-core machine every worker count
+competes for the same CPU.
+"""
+from typing import Any, Dict, List, Optional, Text
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import Turn, build_conversations, summarize  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+
+
+def pss_mb(pid: int) -> Optional[float]:
+    """PSS of a process and its children in MB (Linux only)."""
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="utf-8") as f:
+            pids.extend(int(child) for child in f.read().split())
+        total = 0
+        for process in pids:
+            with open(f"/proc/{process}/smaps_rollup", encoding="utf-8") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+    except (OSError, StopIteration):
+        return None
+    return round(total / 1024, 1)
+
+
+def wait_until_healthy(url: Text, process: subprocess.Popen, timeout: float = 120.0) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Action server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Action server at {url} did not become healthy")
+
+
+async def run_conversation(
+    client, url: Text, index: int, turns: List[Turn], timings: Dict[Text, List[float]], errors: List[Text]
+) -> None:
+    from rasa_sdk import __version__ as rasa_sdk_version
+
+    sender_id = f"bench-workers-{index}"
+    slots: Dict[Text, Any] = {}
+    events: List[Dict[Text, Any]] = []
+    for turn in turns:
+        events.append({"event": "user", "text": turn.text})
+        turn_time = 0.0
+        for name in turn.actions:
+            if name == "action_answer_query" and not slots.get("classified_intent"):
+                continue
+            action_call = {
+                "next_action": name,
+                "sender_id": sender_id,
+                "version": rasa_sdk_version,
+                "domain": {},
+                "tracker": {
+                    "sender_id": sender_id,
+                    "slots": dict(slots),
+                    "latest_message": {"text": turn.text, "intent": {"name": turn.intent}},
+                    "events": list(events),
+                    "paused": False,
+                    "followup_action": None,
+                    "active_loop": {},
+                    "latest_action_name": "action_listen",
+                },
+            }
+            start = time.perf_counter()
+            returned = []
+            try:
+                response = await client.post(f"{url}/webhook", json=action_call)
+                response.raise_for_status()
+                returned = response.json().get("events", [])
+            except Exception as e:
+                errors.append(f"{name}: {e.__class__.__name__}: {' '.join(str(e).split())[:200]}")
+            elapsed = time.perf_counter() - start
+            timings.setdefault(name, []).append(elapsed)
+            turn_time += elapsed
+            for event in returned:
+                events.append(event)
+                if event.get("event") == "slot":
+                    slots[event["name"]] = event["value"]
+        timings["turn"].append(turn_time)
+
+
+async def replay(url: Text, conversations: List[List[Turn]], concurrency: int) -> Dict[Text, Any]:
+    import httpx
+
+    timings: Dict[Text, List[float]] = {"turn": []}
+    errors: List[Text] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+
+        async def bounded(index: int, turns: List[Turn]) -> None:
+            async with semaphore:
+                await run_conversation(client, url, index, turns, timings, errors)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(bounded(i, turns) for i, turns in enumerate(conversations)))
+        duration = time.perf_counter() - start
+    return {"timings": timings, "errors": errors, "duration": duration}
+
+
+def bench(workers: int, args: argparse.Namespace, llm_url: Text, conversations: List[List[Turn]]) -> Dict[Text, Any]:
+    env = dict(
+        os.environ,
+        GROQ_BASE_URL=llm_url,
+        METRICS_PORT="0",
+        LOG_LEVEL="WARNING",
+        CACHE_BACKEND="memory",
+        CPU_POOL_WORKERS=str(args.cpu_pool_workers),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "actions.server", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(args.port)],
+        cwd=ROOT, env=env,
+    )
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_healthy(url, server)
+        result = asyncio.run(replay(url, conversations, args.concurrency))
+        memory = pss_mb(server.pid)
+    finally:
+        server.terminate()
+        try:
+            server.wait(30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+    turns = len(result["timings"]["turn"])
+    return {
+        "workers": workers,
+        "turns": turns,
+        "duration_s": round(result["duration"], 3),
+        "throughput_rps": round(turns / result["duration"], 2) if result["duration"] else 0.0,
+        "latency_ms": {name: summarize(values) for name, values in sorted(result["timings"].items())},
+        "errors": len(result["errors"]),
+        "error_samples": sorted(set(result["errors"]))[:5],
+        "server_pss_mb": memory,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--conversations", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64, help="Conversations in flight at a time")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--cpu-pool-workers", type=int, default=0, help="CPU_POOL_WORKERS for every server worker")
+    parser.add_argument("--port", type=int, default=5095)
+    parser.add_argument("--llm-port", type=int, default=8095)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON results here")
+    args = parser.parse_args()
+
+    conversations = build_conversations(args.conversations, args.seed)
+    llm = subprocess.Popen(
+        [sys.executable, os.path.join(BENCHMARKS, "fake_llm_server.py"), "--port", str(args.llm_port),
+         "--latency", str(args.latency), "--jitter", str(args.jitter), "--seed", str(args.seed)],
+        stdout=subprocess.DEVNULL,
+    )
+    rows = []
+    print(f"{os.cpu_count()} CPUs, {len(conversations)} conversations, concurrency {args.concurrency}")
+    print(f"{'workers':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'PSS MB':>8}")
+    try:
+        for workers in args.workers:
+            row = bench(workers, args, f"http://127.0.0.1:{args.llm_port}", conversations)
+            rows.append(row)
+            turn = row["latency_ms"]["turn"]
+            print(
+                f"{workers:>7} {row['throughput_rps']:>9.1f} {turn['p50']:>9.1f} {turn['p95']:>9.1f} "
+                f"{turn['p99']:>9.1f} {row['errors']:>7} {row['server_pss_mb'] or 0:>8.1f}"
+            )
+    finally:
+        llm.terminate()
+        llm.wait()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"cpus": os.cpu_count(), "config": vars(args), "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
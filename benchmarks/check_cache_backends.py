@@ -0,0 +1,113 @@
+"""Functional check of the shared cache backends without a Redis server.
+
+- redis: create_cache(backend="redis") with a `fakeredis.FakeRedis()` client: set, get through
+  the memory tier, TTL expiry, items() for warm start, delete and clear.
+- sqlite: two processes open the same SQLite file, write their own keys concurrently, and each
+  must read every key the other one wrote. A fresh tiered cache is then warm-started from the file.
+
+    python benchmarks/check_cache_backends.py          # requires `pip install fakeredis` for redis
+    python benchmarks/check_cache_backends.py --skip-redis
+
+Exits with status 1 if any check fails.
+"""
+from typing import List, Text
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.cache import TieredCache, create_cache  # noqa: E402
+
+
+def check(failures: List[Text], name: Text, ok: bool) -> None:
+    print(f"{'ok  ' if ok else 'FAIL'} {name}")
+    if not ok:
+        failures.append(name)
+
+
+def check_redis(failures: List[Text]) -> None:
+    import fakeredis
+
+    client = fakeredis.FakeRedis()
+    cache = create_cache("check", ttl=60, backend="redis", redis_client=client)
+    cache.set("a", {"intent": "fertilizers"})
+    cache.set("b", "short-lived", ttl=1)
+    check(failures, "redis: value written through both tiers", client.get("farmvaidya:check:a") is not None)
+    cache.memory.clear()
+    check(failures, "redis: read falls through to redis", cache.get("a") == {"intent": "fertilizers"})
+    check(failures, "redis: read repopulates memory", cache.memory.get("a") == {"intent": "fertilizers"})
+
+    fresh = create_cache("check", ttl=60, backend="redis", redis_client=client)
+    check(failures, "redis: warm start loads live entries", fresh.warm(10) == 2 and fresh.memory.get("b") == "short-lived")
+    check(failures, "redis: items() honours the limit", len(fresh.shared.items(1)) == 1)
+
+    time.sleep(1.1)
+    check(failures, "redis: entries expire", cache.shared.get("b") is None)
+    cache.delete("a")
+    check(failures, "redis: delete", cache.get("a") is None)
+    cache.set("c", 3)
+    client.set("farmvaidya:other:c", "kept")
+    cache.clear()
+    check(failures, "redis: clear empties only its namespace", cache.shared.items(10) == [] and client.get("farmvaidya:other:c") == b"kept")
+
+
+def sqlite_writer(path: Text, name: Text, other: Text, count: int, barrier, results) -> None:
+    cache = create_cache("check", ttl=60, backend="sqlite", sqlite_path=path)
+    barrier.wait()
+    for i in range(count):
+        cache.set(f"{name}-{i}", {"writer": name, "i": i})
+    barrier.wait()
+    # Read the other writer's keys straight from the file, not from this process's memory tier
+    seen = sum(cache.shared.get(f"{other}-{i}") == {"writer": other, "i": i} for i in range(count))
+    results[name] = seen
+    cache.close()
+
+
+def check_sqlite(failures: List[Text], count: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite3")
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(2)
+        with context.Manager() as manager:
+            results = manager.dict()
+            processes = [
+                context.Process(target=sqlite_writer, args=(path, name, other, count, barrier, results))
+                for name, other in (("first", "second"), ("second", "first"))
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join(60)
+            codes = [process.exitcode for process in processes]
+            results = dict(results)
+        check(failures, "sqlite: both writer processes exited cleanly", codes == [0, 0])
+        check(failures, "sqlite: each process reads every key the other wrote", results == {"first": count, "second": count})
+
+        cache = create_cache("check", ttl=60, backend="sqlite", sqlite_path=path)
+        assert isinstance(cache, TieredCache)
+        check(failures, "sqlite: warm start loads the shared entries", cache.warm(4 * count) == 2 * count)
+        cache.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skip-redis", action="store_true", help="Do not run the fakeredis checks")
+    parser.add_argument("--keys", type=int, default=500, help="Keys each SQLite writer process writes")
+    args = parser.parse_args()
+
+    failures: List[Text] = []
+    if not args.skip_redis:
+        check_redis(failures)
+    check_sqlite(failures, args.keys)
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
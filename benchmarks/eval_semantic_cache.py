@@ -0,0 +1,80 @@
+"""Hit rate and false-hit rate of the semantic answer cache on the data/nlu.yml paraphrases.
+
+The examples of each intent are replayed in shuffled order as a stream of user questions.
+A question that misses is answered and cached, and a question that hits reuses the cached
+answer. A hit is counted as false when the two questions retrieve different knowledge-base
+facts, i.e. the LLM would have been given different data to answer from. An exact-match
+cache on the normalized text is the baseline.
+
+    python benchmarks/eval_semantic_cache.py --thresholds 0.6 0.7 0.8 0.9 --runs 5
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.keywords import INTENTS  # noqa: E402
+from actions.nlu_data import load_nlu_examples  # noqa: E402
+from actions.normalizer import normalize_spelling  # noqa: E402
+from actions.retrieval import get_retriever  # noqa: E402
+from actions.semantic_cache import SemanticCache  # noqa: E402
+
+
+def replay(examples, threshold, seed, show_false_hits=False):
+    """Return (questions, exact hits, semantic hits, false semantic hits) for one shuffled replay."""
+    retriever = get_retriever()
+    rng = random.Random(seed)
+    questions = exact_hits = hits = false_hits = 0
+    cache = SemanticCache(threshold=threshold, ttl=3600)
+    for intent in INTENTS:
+        queries = list(examples.get(intent, []))
+        rng.shuffle(queries)
+        seen = set()
+        for query in queries:
+            questions += 1
+            normalized = normalize_spelling(query.lower())
+            if normalized in seen:
+                exact_hits += 1
+                hits += 1
+                continue
+            seen.add(normalized)
+            hit = cache.lookup(intent, query)
+            if hit is None:
+                cache.put(intent, query, query)
+                continue
+            hits += 1
+            cached_query = hit[1]
+            if set(retriever.select_facts(intent, query)[0]) != set(retriever.select_facts(intent, cached_query)[0]):
+                false_hits += 1
+                if show_false_hits:
+                    print(f"  false hit ({hit[2]:.2f}) [{intent}] {query!r} -> {cached_query!r}")
+    return questions, exact_hits, hits, false_hits
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nlu", default=None, help="Path to the NLU training file (default: data/nlu.yml)")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.6, 0.7, 0.8, 0.9])
+    parser.add_argument("--runs", type=int, default=5, help="Shuffled replays per threshold")
+    parser.add_argument("--show-false-hits", action="store_true", help="Print the false hits of the first run")
+    args = parser.parse_args()
+
+    examples = load_nlu_examples(args.nlu)
+    print(f"{'threshold':>9} {'exact hit':>10} {'hit rate':>9} {'false hits':>11} {'precision':>10}")
+    for threshold in args.thresholds:
+        totals = [0, 0, 0, 0]
+        for seed in range(args.runs):
+            result = replay(examples, threshold, seed, args.show_false_hits and seed == 0)
+            totals = [total + value for total, value in zip(totals, result)]
+        questions, exact_hits, hits, false_hits = totals
+        precision = 1 - false_hits / hits if hits else 1.0
+        print(
+            f"{threshold:>9.2f} {exact_hits / questions:>10.1%} {hits / questions:>9.1%} "
+            f"{false_hits / questions:>11.1%} {precision:>10.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Local fake of the Groq chat-completions endpoint for offline testing and benchmarks.
+
+Run it and point the action server at it:
+
+    python benchmarks/fake_llm_server.py --port 8008 --latency 0.5
+    GROQ_BASE_URL=http://127.0.0.1:8008 GROQ_API_KEY=fake-key rasa run actions
+
+Requests with "stream": true are answered with server-sent chat.completion.chunk events, one
+word per event.
+"""
+from typing import Callable, Optional, Text
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# The fake server ignores the API key, but the client refuses to start without one
+os.environ.setdefault("GROQ_API_KEY", "fake-key")
+
+# Streamed token boundaries: each word with its leading whitespace
+TOKEN_RE = re.compile(r"\s*\S+")
+
+# Keywords used by the default responder to pick a plausible intent for classification prompts
+INTENT_HINTS = [
+    ("nutrient_management", ["yellow", "deficiency", "spathe"]),
+    ("fertilizers", ["fertilizer", "urea", "potash", "neem"]),
+    ("coconut_varieties", ["variety", "ganga", "hybrid", "tall"]),
+    ("organic_manures", ["manure", "compost"]),
+    ("cultivation_methods", ["nursery", "seed", "planting"]),
+    ("climate_soils", ["climate", "soil", "rainfall"]),
+    ("inter_cultivation", ["intercrop", "weed", "plow"]),
+    ("coconut_general", ["area", "research", "district"]),
+]
+
+
+def guess_intent(query: Text) -> dict:
+    for intent, hints in INTENT_HINTS:
+        if any(hint in query.lower() for hint in hints):
+            return {"intent": intent}
+    return {"intent": "ambiguous", "clarifying_question": "Could you clarify your question?"}
+
+
+def default_responder(prompt: Text, max_tokens: int) -> Text:
+    """Return a deterministic, prompt-dependent completion."""
+    if "classify" in prompt.lower():
+        if "Queries:" in prompt:
+            # Batched classification: one numbered query per line, answered with a JSON array
+            queries = re.findall(r"^\s*\d+\. (.*)$", prompt.split("Queries:", 1)[1], re.MULTILINE)
+            return json.dumps([guess_intent(query) for query in queries])
+        query_match = re.search(r"User query: (.*)", prompt)
+        return json.dumps(guess_intent(query_match.group(1) if query_match else prompt))
+    return "Coconut trees need care. This is a fake answer for offline testing."
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 drops bursts of concurrent connects into SYN retransmits
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class FakeLLMServer:
+    """Threaded HTTP server answering POST /openai/v1/chat/completions."""
+
+    def __init__(
+        self,
+        host: Text = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        responder: Callable[[Text, int], Text] = default_responder,
+        token_latency: float = 0.0,
+    ) -> None:
+        self.latency = latency
+        self.token_latency = token_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.responder = responder
+        self.request_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.httpd = _Server((host, port), self._make_handler())
+
+    @property
+    def base_url(self) -> Text:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _next_delay_and_error(self):
+        with self._lock:
+            self.request_count += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            failed = self._random.random() < self.error_rate
+        return delay, failed
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so client connection pooling is exercised
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: dict) -> None:
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_chunk(self, data: Text) -> None:
+                payload = f"data: {data}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+                self.wfile.flush()
+
+            def _send_stream(self, content: Text, model: Text, usage: dict) -> None:
+                # Server-sent events over chunked transfer encoding, one word per event
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                chunk = {
+                    "id": f"chatcmpl-fake-{server.request_count}",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                }
+                for token in TOKEN_RE.findall(content):
+                    time.sleep(server.token_latency)
+                    self._send_chunk(json.dumps({
+                        **chunk,
+                        "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                    }))
+                self._send_chunk(json.dumps({
+                    **chunk,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                    "x_groq": {"id": chunk["id"], "usage": usage},
+                }))
+                self._send_chunk("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                delay, failed = server._next_delay_and_error()
+                time.sleep(delay)
+                if failed:
+                    self._send_json(503, {"error": {"message": "injected failure"}})
+                    return
+                prompt = request["messages"][-1]["content"]
+                max_tokens = request.get("max_tokens") or 500
+                content = server.responder(prompt, max_tokens)
+                usage = {
+                    "prompt_tokens": len(prompt.split()),
+                    "completion_tokens": len(content.split()),
+                    "total_tokens": len(prompt.split()) + len(content.split()),
+                }
+                if request.get("stream"):
+                    try:
+                        self._send_stream(content, request.get("model", "fake"), usage)
+                    except (BrokenPipeError, ConnectionResetError):
+                        # The client stopped reading mid-stream
+                        self.close_connection = True
+                    return
+                time.sleep(server.token_latency * len(TOKEN_RE.findall(content)))
+                self._send_json(200, {
+                    "id": f"chatcmpl-fake-{server.request_count}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": usage,
+                })
+
+        return Handler
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Generation time per word in seconds")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        args.host, args.port, args.latency, args.jitter, args.error_rate, args.seed,
+        token_latency=args.token_latency,
+    )
+    print(f"Fake LLM server listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
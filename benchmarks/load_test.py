@@ -0,0 +1,310 @@
+"""Offline load test of the custom actions against the fake LLM server.
+
+Conversations are generated from the stories in data/stories.yml, with each user turn drawn
+from the matching intent's examples in data/nlu.yml. The harness runs ActionClassifyIntent,
+ActionAnswerQuery and ActionHandleMultiIntent in-process on synthetic Trackers, with
+--concurrency conversations in flight at a time. It writes a JSON report with latency
+percentiles, throughput, LLM calls, cache hit ratios, fallbacks and peak RSS.
+
+    python benchmarks/load_test.py --conversations 200 --concurrency 16 --latency 0.2 --output report.json
+    python benchmarks/load_test.py --baseline report.json --max-regression 0.2   # exit code 1 on regression
+
+Peak RSS covers the whole process, including the in-process fake server. Pass --base-url to
+use an external server instead.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Text
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import sys
+import time
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Keep the harness quiet and off the metrics port unless asked otherwise
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("METRICS_PORT", "0")
+
+from fake_llm_server import FakeLLMServer  # noqa: E402
+from actions.nlu_data import PROJECT_ROOT, load_nlu_examples  # noqa: E402
+
+STORIES_PATH = os.path.join(PROJECT_ROOT, "data", "stories.yml")
+
+# (report key, True if higher is worse) compared against --baseline
+REGRESSION_KEYS = [
+    ("latency_ms.turn.p50", True),
+    ("latency_ms.turn.p95", True),
+    ("latency_ms.turn.p99", True),
+    ("throughput_rps", False),
+    ("llm.calls_per_turn", True),
+    ("peak_rss_mb", True),
+]
+
+
+class Turn(NamedTuple):
+    text: Text
+    intent: Text
+    actions: List[Text]
+
+
+def load_stories(path: Text = STORIES_PATH) -> List[Dict[Text, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f).get("stories", [])
+
+
+def build_conversation(
+    story: Dict[Text, Any], examples: Dict[Text, List[Text]], custom_actions: List[Text], rng: random.Random
+) -> List[Turn]:
+    """Turn a story into user turns, each with the custom actions that follow it."""
+    turns: List[Turn] = []
+    for step in story.get("steps", []):
+        intent = step.get("intent")
+        if "or" in step:
+            intent = rng.choice([option["intent"] for option in step["or"] if "intent" in option])
+        if intent:
+            if intent in examples:
+                turns.append(Turn(rng.choice(examples[intent]), intent, []))
+        elif step.get("action") in custom_actions and turns:
+            turns[-1].actions.append(step["action"])
+    return [turn for turn in turns if turn.actions]
+
+
+def build_conversations(count: int, seed: int) -> List[List[Turn]]:
+    from actions.actions import ActionAnswerQuery, ActionClassifyIntent, ActionHandleMultiIntent
+
+    custom_actions = [action().name() for action in (ActionClassifyIntent, ActionAnswerQuery, ActionHandleMultiIntent)]
+    rng = random.Random(seed)
+    examples = load_nlu_examples()
+    stories = load_stories()
+    conversations = []
+    while len(conversations) < count:
+        conversation = build_conversation(rng.choice(stories), examples, custom_actions, rng)
+        if conversation:
+            conversations.append(conversation)
+    return conversations
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of `values` for q in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def summarize(values: List[float]) -> Dict[Text, float]:
+    milliseconds = [value * 1000 for value in values]
+    return {
+        "count": len(milliseconds),
+        "mean": round(sum(milliseconds) / len(milliseconds), 2) if milliseconds else 0.0,
+        "p50": round(percentile(milliseconds, 50), 2),
+        "p95": round(percentile(milliseconds, 95), 2),
+        "p99": round(percentile(milliseconds, 99), 2),
+        "max": round(max(milliseconds), 2) if milliseconds else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def run_conversation(
+    index: int, turns: List[Turn], actions: Dict[Text, Any], timings: Dict[Text, List[float]], errors: List[Text]
+) -> None:
+    from rasa_sdk import Tracker
+    from rasa_sdk.executor import CollectingDispatcher
+
+    sender_id = f"load-test-{index}"
+    slots: Dict[Text, Any] = {}
+    events: List[Dict[Text, Any]] = []
+    for turn in turns:
+        events.append({"event": "user", "text": turn.text})
+        turn_time = 0.0
+        for name in turn.actions:
+            if name == "action_answer_query" and not slots.get("classified_intent"):
+                # Rasa asks for clarification instead when classification set no intent
+                continue
+            tracker = Tracker(
+                sender_id, dict(slots), {"text": turn.text, "intent": {"name": turn.intent}},
+                list(events), False, None, {}, "action_listen",
+            )
+            start = time.perf_counter()
+            try:
+                returned = await actions[name].run(CollectingDispatcher(), tracker, {})
+            except Exception as e:
+                errors.append(f"{name}: {e.__class__.__name__}: {' '.join(str(e).split())[:200]}")
+                returned = []
+            elapsed = time.perf_counter() - start
+            timings.setdefault(name, []).append(elapsed)
+            turn_time += elapsed
+            for event in returned:
+                events.append(event)
+                if event.get("event") == "slot":
+                    slots[event["name"]] = event["value"]
+        timings["turn"].append(turn_time)
+
+
+async def run_load(conversations: List[List[Turn]], concurrency: int, base_url: Text, max_retries: int) -> Dict[Text, Any]:
+    import actions.llm_client as llm_client
+    from actions.actions import ActionAnswerQuery, ActionClassifyIntent, ActionHandleMultiIntent
+    from actions.cache import answer_cache, classify_cache
+
+    classify_cache.clear()
+    answer_cache.clear()
+    llm_client._llm_client = llm_client.LLMClient(base_url=base_url, max_retries=max_retries)
+    actions = {action.name(): action for action in (ActionClassifyIntent(), ActionAnswerQuery(), ActionHandleMultiIntent())}
+    timings: Dict[Text, List[float]] = {"turn": []}
+    errors: List[Text] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(index: int, turns: List[Turn]) -> None:
+        async with semaphore:
+            await run_conversation(index, turns, actions, timings, errors)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(bounded(i, turns) for i, turns in enumerate(conversations)))
+    duration = time.perf_counter() - start
+    await llm_client._llm_client.close()
+    return {"timings": timings, "errors": errors, "duration": duration}
+
+
+def counter_deltas(counter, before: Dict) -> Dict:
+    return {key: value - before.get(key, 0.0) for key, value in counter.snapshot().items()}
+
+
+def build_report(args: argparse.Namespace, result: Dict[Text, Any], counters: Dict[Text, Dict]) -> Dict[Text, Any]:
+    timings = result["timings"]
+    turns = len(timings["turn"])
+    llm_requests = int(sum(counters["llm_requests"].values()))
+    cache = {}
+    for (name, outcome), value in counters["cache"].items():
+        cache.setdefault(name, {"hits": 0, "misses": 0})["hits" if outcome == "hit" else "misses"] += int(value)
+    for stats in cache.values():
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return {
+        "config": {
+            "conversations": args.conversations,
+            "concurrency": args.concurrency,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+            "seed": args.seed,
+            "external_llm": bool(args.base_url),
+        },
+        "turns": turns,
+        "duration_s": round(result["duration"], 3),
+        "throughput_rps": round(turns / result["duration"], 2) if result["duration"] else 0.0,
+        "latency_ms": {name: summarize(values) for name, values in sorted(timings.items())},
+        "llm": {
+            "calls": llm_requests,
+            "failed_attempts": int(sum(
+                value for (mode, outcome), value in counters["llm_requests"].items() if outcome != "ok"
+            )),
+            "calls_per_turn": round(llm_requests / turns, 3) if turns else 0.0,
+            "prompt_tokens": int(counters["tokens"].get(("prompt",), 0)),
+            "completion_tokens": int(counters["tokens"].get(("completion",), 0)),
+        },
+        "cache": cache,
+        "intent_sources": {source: int(value) for (source,), value in sorted(counters["sources"].items())},
+        "fallbacks": {f"{action}:{reason}": int(value) for (action, reason), value in sorted(counters["fallbacks"].items())},
+        "errors": len(result["errors"]),
+        "error_samples": sorted(set(result["errors"]))[:5],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def lookup(report: Dict[Text, Any], key: Text) -> Optional[float]:
+    value: Any = report
+    for part in key.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def find_regressions(report: Dict[Text, Any], baseline: Dict[Text, Any], max_regression: float) -> List[Text]:
+    regressions = []
+    for key, higher_is_worse in REGRESSION_KEYS:
+        current, previous = lookup(report, key), lookup(baseline, key)
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous
+        if (change if higher_is_worse else -change) > max_regression:
+            regressions.append(f"{key}: {previous} -> {current} ({change:+.1%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=200, help="Number of story-based conversations")
+    parser.add_argument("--concurrency", type=int, default=16, help="Conversations in flight at a time")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Fake LLM uniform +/- jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake LLM requests failing with 503")
+    parser.add_argument("--max-retries", type=int, default=2, help="LLM client retries per call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-url", help="Use this chat-completions server instead of an in-process fake")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative regression vs the baseline")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    from actions.metrics import CACHE_LOOKUPS, FALLBACKS, INTENT_SOURCES, LLM_REQUESTS, LLM_TOKENS
+
+    conversations = build_conversations(args.conversations, args.seed)
+    counters = {
+        "cache": CACHE_LOOKUPS,
+        "tokens": LLM_TOKENS,
+        "sources": INTENT_SOURCES,
+        "fallbacks": FALLBACKS,
+        "llm_requests": LLM_REQUESTS,
+    }
+    before = {name: counter.snapshot() for name, counter in counters.items()}
+
+    if args.base_url:
+        result = asyncio.run(run_load(conversations, args.concurrency, args.base_url, args.max_retries))
+    else:
+        with FakeLLMServer(
+            latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed
+        ) as server:
+            result = asyncio.run(run_load(conversations, args.concurrency, server.base_url, args.max_retries))
+
+    deltas = {name: counter_deltas(counter, before[name]) for name, counter in counters.items()}
+    report = build_report(args, result, deltas)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    turn = report["latency_ms"]["turn"]
+    print(
+        f"{report['turns']} turns in {report['duration_s']}s ({report['throughput_rps']} rps); "
+        f"turn p50/p95/p99 {turn['p50']}/{turn['p95']}/{turn['p99']} ms; "
+        f"{report['llm']['calls_per_turn']} LLM calls/turn; peak RSS {report['peak_rss_mb']} MB",
+        file=sys.stderr,
+    )
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(report, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()